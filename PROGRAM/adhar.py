@@ -1,7 +1,63 @@
-import pandas as pd
+import argparse
 import glob
 import os
 
+import pandas as pd
+
+import instrument
+from artifacts import BUNDLE_DIR, build_bundle, write_bundle
+from classify import (
+    THRESHOLD_RULES,
+    classify,
+    dropout_risk,
+    escalate_risk,
+    load_rules,
+    recommend_actions
+)
+from engines import DEFAULT_ENGINE, ENGINES, dataset_sums
+from forecast import DEFAULT_METHOD, METHODS, export_forecast, forecast_level
+from geo import GEOJSON_PATH
+from ingest import (
+    aggregate_state_streaming,
+    incremental_state_sums,
+    load_csvs_cached,
+    load_csvs_parallel
+)
+from query import build_index, lookup
+from report import FIGURES, render_report
+from scoring import (
+    DEFAULT_CONFIG,
+    assi_components,
+    capacity_proxy,
+    config_version,
+    load_config,
+    normalize,
+    normalize_components
+)
+from schema import COUNT_NAMES, count_columns, dataset_counts
+from states import canonical_districts, canonical_states, canonicalize_sums
+from timeseries import FREQUENCIES, export_timeseries, state_timeseries
+
+
+ENROL_DIR = "api_data_aadhar_enrolment"
+DEMO_DIR = "api_data_aadhar_demographic"
+BIO_DIR = "api_data_aadhar_biometric"
+OUTPUT_PATH = "aadhaar_bottleneck_prediction.csv"
+
+# Loader modes for STEPs 2-3:
+#   full        - read every column of every shard (original behaviour)
+#   fast        - parallel shard reads, only `state` + count column,
+#                 categorical state and int32 counts
+#   cached      - Feather cache of parsed shards keyed by path/size/mtime
+#                 (needs pyarrow)
+#   stream      - fold chunked per-state sums, never hold the raw tables
+#   incremental - persisted per-state sums, only new shards are read
+LOADERS = ("full", "fast", "cached", "stream", "incremental")
+RAW_LOADERS = ("full", "cached")
+DEFAULT_LOADER = "cached"
+CACHE_DIR = ".ingest_cache"
+INCREMENTAL_DIR = ".lifecycle_state"
+
 
 def load_csvs_from_folder(folder_path):
     csv_files = glob.glob(
@@ -24,603 +80,743 @@ def load_csvs_from_folder(folder_path):
     return pd.concat(df_list, ignore_index=True)
 
 
-print("program started...")
-
-# 2️⃣ Folder-based loading (THIS IS STEP 2)
-enrol = load_csvs_from_folder("api_data_aadhar_enrolment")
-demo  = load_csvs_from_folder("api_data_aadhar_demographic")
-bio   = load_csvs_from_folder("api_data_aadhar_biometric")
+# -------------------------------
+# STEP 2: LOADING & CLEANING
+# -------------------------------
 
+@instrument.stage("load")
+def load_raw(folders, loader="cached", cache_dir=CACHE_DIR):
+    """Load the enrolment, demographic and biometric tables."""
+    if loader == "cached":
+        def read(folder):
+            return load_csvs_cached(folder, cache_dir=cache_dir)
+    elif loader == "fast":
+        read = load_csvs_parallel
+    else:
+        read = load_csvs_from_folder
 
+    enrol, demo, bio = (read(folder) for folder in folders)
 
+    print("Enrolment loaded:", enrol.shape)
+    print("Demographic loaded:", demo.shape)
+    print("Biometric loaded:", bio.shape)
 
-print("Enrolment loaded:", enrol.shape)
-print("Demographic loaded:", demo.shape)
-print("Biometric loaded:", bio.shape)
+    # Make column names lowercase & clean
+    enrol.columns = enrol.columns.str.strip().str.lower()
+    demo.columns  = demo.columns.str.strip().str.lower()
+    bio.columns   = bio.columns.str.strip().str.lower()
 
-print("\nENROLMENT COLUMNS:")
-print(enrol.columns)
-
-print("\nDEMOGRAPHIC UPDATE COLUMNS:")
-print(demo.columns)
-
-print("\nBIOMETRIC UPDATE COLUMNS:")
-print(bio.columns)
-
-
-# -------------------------------
-# STEP 2: DATA CLEANING
-# -------------------------------
-
-# Make column names lowercase & clean
-enrol.columns = enrol.columns.str.strip().str.lower()
-demo.columns  = demo.columns.str.strip().str.lower()
-bio.columns   = bio.columns.str.strip().str.lower()
-
-print("\nCleaned Enrolment Columns:", enrol.columns)
-print("Cleaned Demographic Columns:", demo.columns)
-print("Cleaned Biometric Columns:", bio.columns)
+    # Canonical state names (states.py), applied once as a categorical
+    # code mapping; every groupby below runs on the codes
+    for df in (enrol, demo, bio):
+        df["state"] = canonical_states(df["state"])
 
+    print("\nCleaned Enrolment Columns:", enrol.columns)
+    print("Cleaned Demographic Columns:", demo.columns)
+    print("Cleaned Biometric Columns:", bio.columns)
 
+    return enrol, demo, bio
 
 
 # -------------------------------
 # STEP 3: LIFECYCLE METRICS
 # -------------------------------
 
-# Rename common columns (adjust if names differ)
-enrol = enrol.rename(columns={
-    enrol.columns[-1]: "enrolment_count"
-})
+@instrument.stage("aggregate")
+def aggregate_states(enrol, demo, bio):
+    # Count columns come from the schema map (schema.py), not position:
+    # every age bucket is kept. One state-wise groupby per dataset sums
+    # all of its cohort columns; the dataset total is their sum.
+    return tuple(
+        dataset_counts(
+            df.groupby("state", observed=True)[count_columns(df.columns)].sum(),
+            name
+        )
+        for df, name in zip((enrol, demo, bio), COUNT_NAMES)
+    )
 
-demo = demo.rename(columns={
-    demo.columns[-1]: "demographic_updates"
-})
 
-bio = bio.rename(columns={
-    bio.columns[-1]: "biometric_updates"
-})
+def load_state_sums(folders, loader=DEFAULT_LOADER, cache_dir=CACHE_DIR,
+                    incremental_dir=INCREMENTAL_DIR, engine=DEFAULT_ENGINE):
+    """
+    Per-state enrolment / demographic / biometric totals, each with its
+    age-cohort sums (STEPs 2-3).
+
+    A non-pandas `engine` (engines.py) replaces the loader with one
+    out-of-core query per dataset.
+    """
+    if engine != "pandas":
+        return tuple(
+            canonicalize_sums(sums)
+            for sums in dataset_sums(folders, ["state"], COUNT_NAMES, engine)
+        )
+
+    if loader == "incremental":
+        # Persisted per-state sums + newly arrived shards only
+        return tuple(
+            canonicalize_sums(incremental_state_sums(folder, name, incremental_dir))
+            for folder, name in zip(folders, COUNT_NAMES)
+        )
+
+    if loader == "stream":
+        # Chunked per-state sums; raw rows are dropped after each chunk
+        return tuple(
+            canonicalize_sums(aggregate_state_streaming(folder, name))
+            for folder, name in zip(folders, COUNT_NAMES)
+        )
+
+    enrol, demo, bio = load_raw(folders, loader, cache_dir)
+    return aggregate_states(enrol, demo, bio)
+
+
+def add_update_totals(lifecycle):
+    # Total updates & ratio
+    lifecycle["total_updates"] = (
+        lifecycle["demographic_updates"] + lifecycle["biometric_updates"]
+    )
 
-# Aggregate state-wise
-enrol_state = enrol.groupby("state")["enrolment_count"].sum()
-demo_state  = demo.groupby("state")["demographic_updates"].sum()
-bio_state   = bio.groupby("state")["biometric_updates"].sum()
+    lifecycle["update_ratio"] = (
+        lifecycle["total_updates"] / lifecycle["enrolment_count"]
+    )
 
-# Combine lifecycle data
-lifecycle = pd.concat([enrol_state, demo_state, bio_state], axis=1).fillna(0)
+    return lifecycle
 
-# Total updates & ratio
-lifecycle["total_updates"] = (
-    lifecycle["demographic_updates"] + lifecycle["biometric_updates"]
-)
 
-lifecycle["update_ratio"] = (
-    lifecycle["total_updates"] / lifecycle["enrolment_count"]
-)
-
-print("\nAadhaar Lifecycle Table:")
-print(lifecycle.head())
+@instrument.stage("lifecycle")
+def build_lifecycle(enrol_state, demo_state, bio_state):
+    # Combine lifecycle data
+    lifecycle = pd.concat([enrol_state, demo_state, bio_state], axis=1).fillna(0)
+    lifecycle.index = lifecycle.index.astype(str).rename("state")
+    lifecycle = add_update_totals(lifecycle)
 
+    print("\nAadhaar Lifecycle Table:")
+    print(lifecycle.head())
 
+    return lifecycle
 
 
 # -------------------------------
 # STEP 4: DATA CLEANING
 # -------------------------------
 
-# Standardize state names
-lifecycle.index = lifecycle.index.str.strip().str.lower()
-
-# Merge duplicate Andaman names
-lifecycle = lifecycle.rename(index={
-    "andaman & nicobar islands": "andaman and nicobar islands"
-})
-
-# Remove invalid state codes (numeric-only)
-lifecycle = lifecycle[~lifecycle.index.str.isnumeric()]
+@instrument.stage("clean")
+def clean_lifecycle(lifecycle):
+    # State names were canonicalised (and numeric codes dropped) at ingest
 
-# Remove zero enrolment rows (cannot compute lifecycle)
-lifecycle = lifecycle[lifecycle["enrolment_count"] > 0]
-
-print("\nCleaned Lifecycle Table:")
-print(lifecycle.head())
+    # Remove zero enrolment rows (cannot compute lifecycle)
+    lifecycle = lifecycle[lifecycle["enrolment_count"] > 0]
 
+    print("\nCleaned Lifecycle Table:")
+    print(lifecycle.head())
 
+    return lifecycle
 
 
 # -------------------------------
 # STEP 5: REGION CLASSIFICATION
 # -------------------------------
 
-def classify_region(ratio):
-    if ratio < 1:
-        return "Stable Identity Region"
-    elif ratio < 5:
-        return "Moderate Update Region"
-    else:
-        return "High Mobility / High Correction Region"
-
-lifecycle["region_type"] = lifecycle["update_ratio"].apply(classify_region)
-
-print("\nRegion Classification:")
-print(lifecycle[["update_ratio", "region_type"]].head())
-
-
-
-
-import matplotlib.pyplot as plt
+# Thresholds and labels for every classification step live in
+# classify.THRESHOLD_RULES; each step is a single vectorised pass.
 
-lifecycle["update_ratio"].sort_values(ascending=False).head(10).plot(
-    kind="bar",
-    figsize=(10,5),
-    title="Top States by Aadhaar Update Ratio"
-)
-
-plt.ylabel("Update Ratio")
-plt.show()
+@instrument.stage("classification")
+def add_region_type(lifecycle, rules=THRESHOLD_RULES):
+    lifecycle["region_type"] = classify(
+        lifecycle["update_ratio"], rules["region_type"]
+    )
 
+    print("\nRegion Classification:")
+    print(lifecycle[["update_ratio", "region_type"]].head())
 
+    return lifecycle
 
 
 # -------------------------------
 # STEP 6: BOTTLENECK SIGNAL
+# STEP 7: BOTTLENECK RISK PREDICTION
 # -------------------------------
 
-lifecycle["update_pressure"] = lifecycle["update_ratio"]
-
-print("\nUpdate Pressure (Bottleneck Signal):")
-print(lifecycle["update_pressure"].describe())
-
-
-
-
+@instrument.stage("classification")
+def add_bottleneck_risk(lifecycle, rules=THRESHOLD_RULES, forecast=None):
+    lifecycle["update_pressure"] = lifecycle["update_ratio"]
 
-# -------------------------------
-# STEP 7: BOTTLENECK RISK PREDICTION
-# -------------------------------
+    print("\nUpdate Pressure (Bottleneck Signal):")
+    print(lifecycle["update_pressure"].describe())
 
-def bottleneck_risk(pressure):
-    if pressure < 1:
-        return "Low Risk"
-    elif pressure < 5:
-        return "Medium Risk"
-    else:
-        return "High Bottleneck Risk"
+    risk = classify(lifecycle["update_pressure"], rules["bottleneck_risk"])
 
-lifecycle["bottleneck_risk"] = lifecycle["update_pressure"].apply(bottleneck_risk)
+    # STEP 7b: the same rule on the forecast update pressure (forecast.py)
+    # escalates regions heading into a bottleneck; regions without a
+    # forecast keep their label
+    if forecast is not None:
+        forecast = forecast.reindex(lifecycle.index)
+        for column in forecast:
+            lifecycle[column] = forecast[column]
+        pressure = lifecycle["forecast_update_pressure"]
+        lifecycle["forecast_risk"] = classify(
+            pressure, rules["bottleneck_risk"]
+        ).where(pressure.notna())
+        risk = escalate_risk(risk, lifecycle["forecast_risk"])
 
-print("\nBottleneck Risk Prediction:")
-print(
-    lifecycle[["update_pressure", "bottleneck_risk"]]
-    .sort_values("update_pressure", ascending=False)
-    .head(10)
-)
+    lifecycle["bottleneck_risk"] = risk
 
+    print("\nBottleneck Risk Prediction:")
+    print(
+        lifecycle[["update_pressure", "bottleneck_risk"]]
+        .sort_values("update_pressure", ascending=False)
+        .head(10)
+    )
 
+    return lifecycle
 
 
 # -------------------------------
 # STEP 8: ENROLMENT DROPOUT RISK (PROXY)
 # -------------------------------
 
-median_enrolment = lifecycle["enrolment_count"].median()
-
-lifecycle["dropout_risk"] = lifecycle.apply(
-    lambda row: "High Dropout Risk"
-    if row["bottleneck_risk"] == "High Bottleneck Risk"
-    and row["enrolment_count"] < median_enrolment
-    else "Low Dropout Risk",
-    axis=1
-)
-
-print("\nDropout Risk Prediction:")
-print(
-    lifecycle[["enrolment_count", "bottleneck_risk", "dropout_risk"]]
-    .head(10)
-)
-
+@instrument.stage("classification")
+def add_dropout_risk(lifecycle):
+    lifecycle["dropout_risk"] = dropout_risk(
+        lifecycle["bottleneck_risk"], lifecycle["enrolment_count"]
+    )
 
+    print("\nDropout Risk Prediction:")
+    print(
+        lifecycle[["enrolment_count", "bottleneck_risk", "dropout_risk"]]
+        .head(10)
+    )
 
+    return lifecycle
 
 
 # -------------------------------
 # STEP 9: ACTION RECOMMENDATIONS
 # -------------------------------
 
-def recommend_action(risk):
-    if risk == "High Bottleneck Risk":
-        return "Deploy temporary enrolment centres / vans"
-    elif risk == "Medium Risk":
-        return "Increase staffing during peak hours"
-    else:
-        return "No immediate intervention required"
-
-lifecycle["recommended_action"] = lifecycle["bottleneck_risk"].apply(recommend_action)
-
-print("\nActionable Recommendations:")
-print(
-    lifecycle[[
-        "update_pressure",
-        "bottleneck_risk",
-        "dropout_risk",
-        "recommended_action"
-    ]]
-    .head(10)
-)
-
+@instrument.stage("classification")
+def add_recommended_action(lifecycle):
+    lifecycle["recommended_action"] = recommend_actions(lifecycle["bottleneck_risk"])
 
+    print("\nActionable Recommendations:")
+    print(
+        lifecycle[[
+            "update_pressure",
+            "bottleneck_risk",
+            "dropout_risk",
+            "recommended_action"
+        ]]
+        .head(10)
+    )
 
+    return lifecycle
 
 
 # -------------------------------
 # STEP 10: ASSI V2 (SERVICE STRESS INDEX)
 # -------------------------------
 
-# Base components
-lifecycle["friction_pressure"] = (
-    lifecycle["total_updates"] / lifecycle["enrolment_count"]
-)
+@instrument.stage("assi")
+def add_assi(lifecycle, config=DEFAULT_CONFIG):
+    # Components (friction pressure, update load, biometric pressure,
+    # enrolment weakness, and the age-cohort MBU backlog and child update
+    # share) and their normalised versions
+    raw = assi_components(lifecycle)
+    norm = normalize_components(raw, config["normalization"])
+    for column in raw:
+        lifecycle[column] = raw[column]
+    for column in norm:
+        lifecycle[column] = norm[column]
 
-lifecycle["update_load"] = lifecycle["total_updates"]
+    # ASSI score (0–100); scoring.score_configs does the same for many
+    # configs at once
+    lifecycle["assi"] = sum(
+        weight * lifecycle[component]
+        for component, weight in config["weights"].items()
+    ) * 100
 
-lifecycle["biometric_pressure"] = (
-    lifecycle["biometric_updates"] / lifecycle["total_updates"]
-)
+    lifecycle["assi"] = lifecycle["assi"].round(1)
 
-lifecycle["enrolment_weakness"] = 1 / lifecycle["enrolment_count"]
-
-# Normalization
-def normalize(series):
-    return (series - series.min()) / (series.max() - series.min())
-
-lifecycle["fp_norm"] = normalize(lifecycle["friction_pressure"])
-lifecycle["ul_norm"] = normalize(lifecycle["update_load"])
-lifecycle["bp_norm"] = normalize(lifecycle["biometric_pressure"])
-lifecycle["ew_norm"] = normalize(lifecycle["enrolment_weakness"])
-
-# ASSI score (0–100)
-lifecycle["assi"] = (
-    0.35 * lifecycle["fp_norm"] +
-    0.25 * lifecycle["ul_norm"] +
-    0.20 * lifecycle["bp_norm"] +
-    0.20 * lifecycle["ew_norm"]
-) * 100
-
-lifecycle["assi"] = lifecycle["assi"].round(1)
-
-print("\nASSI (Aadhaar Service Stress Index) added:")
-print(lifecycle[["assi"]].head())
-
-# Optional: plot top ASSI states
-lifecycle.sort_values("assi", ascending=False).head(10)[
-    "assi"
-].plot(
-    kind="bar",
-    figsize=(10,5),
-    title="Top States by Aadhaar Service Stress Index (ASSI)"
-)
+    print("\nASSI (Aadhaar Service Stress Index) added:",
+          config_version(config))
+    print(lifecycle[["assi"]].head())
 
-plt.ylabel("ASSI (0–100)")
-plt.show()
+    return lifecycle
 
 
 # -------------------------------
 # STEP 10.5: UPDATE QUALITY & SYSTEM FRICTION ANALYSIS
 # -------------------------------
 
-# Friction ratio: updates per enrolment
-lifecycle["friction_ratio"] = (
-    lifecycle["total_updates"] / lifecycle["enrolment_count"]
-)
-
-# Normalize friction score (0–100)
-lifecycle["friction_score"] = (
-    (lifecycle["friction_ratio"] - lifecycle["friction_ratio"].min()) /
-    (lifecycle["friction_ratio"].max() - lifecycle["friction_ratio"].min())
-) * 100
-
-lifecycle["friction_score"] = lifecycle["friction_score"].round(1)
+@instrument.stage("friction")
+def add_friction(lifecycle, rules=THRESHOLD_RULES):
+    # Friction ratio: updates per enrolment
+    lifecycle["friction_ratio"] = (
+        lifecycle["total_updates"] / lifecycle["enrolment_count"]
+    )
 
-# Classify friction level
-def friction_level(x):
-    if x < 30:
-        return "Low Friction"
-    elif x < 60:
-        return "Moderate Friction"
-    else:
-        return "High Friction"
-
-lifecycle["friction_level"] = lifecycle["friction_score"].apply(friction_level)
-
-print("\nUpdate Quality & System Friction Analysis:")
-print(
-    lifecycle[[
-        "friction_ratio",
-        "friction_score",
-        "friction_level"
-    ]]
-    .sort_values("friction_score", ascending=False)
-    .head(10)
-)
+    # Normalize friction score (0–100)
+    lifecycle["friction_score"] = (
+        (lifecycle["friction_ratio"] - lifecycle["friction_ratio"].min()) /
+        (lifecycle["friction_ratio"].max() - lifecycle["friction_ratio"].min())
+    ) * 100
 
-# Optional visualization
-lifecycle.sort_values("friction_score", ascending=False).head(10)[
-    "friction_score"
-].plot(
-    kind="bar",
-    figsize=(10,5),
-    title="Top States by Aadhaar Update Friction Score"
-)
+    lifecycle["friction_score"] = lifecycle["friction_score"].round(1)
 
-plt.ylabel("Friction Score (0–100)")
-plt.show()
+    # Classify friction level
+    lifecycle["friction_level"] = classify(
+        lifecycle["friction_score"], rules["friction_level"]
+    )
 
+    print("\nUpdate Quality & System Friction Analysis:")
+    print(
+        lifecycle[[
+            "friction_ratio",
+            "friction_score",
+            "friction_level"
+        ]]
+        .sort_values("friction_score", ascending=False)
+        .head(10)
+    )
 
+    return lifecycle
 
 
 # -------------------------------
 # STEP 10.6: INTERVENTION EFFICIENCY SCORE (IES)
 # -------------------------------
 
-# Avoid division by zero
-lifecycle["enrolment_capacity_proxy"] = lifecycle["enrolment_count"].replace(0, 1)
-
-# Compute raw IES
-lifecycle["ies_raw"] = (
-    lifecycle["assi"] / lifecycle["enrolment_capacity_proxy"]
-)
+@instrument.stage("ies")
+def add_ies(lifecycle, rules=THRESHOLD_RULES):
+    # Avoid division by zero
+    lifecycle["enrolment_capacity_proxy"] = capacity_proxy(lifecycle["enrolment_count"])
 
+    # Compute raw IES
+    lifecycle["ies_raw"] = (
+        lifecycle["assi"] / lifecycle["enrolment_capacity_proxy"]
+    )
 
-# Normalize IES to 0–100 scale
-lifecycle["ies_score"] = (
-    (lifecycle["ies_raw"] - lifecycle["ies_raw"].min()) /
-    (lifecycle["ies_raw"].max() - lifecycle["ies_raw"].min())
-) * 100
-
-lifecycle["ies_score"] = lifecycle["ies_score"].round(1)
+    # Normalize IES to 0–100 scale
+    lifecycle["ies_score"] = (normalize(lifecycle["ies_raw"]) * 100).round(1)
 
+    lifecycle["intervention_priority"] = classify(
+        lifecycle["ies_score"], rules["intervention_priority"]
+    )
 
-def intervention_priority(x):
-    if x >= 70:
-        return "🔥 High ROI Intervention Zone"
-    elif x >= 40:
-        return "⚠️ Medium ROI Zone"
-    else:
-        return "Low ROI Zone"
+    print("\nTop Intervention Efficiency Regions:")
+    print(
+        lifecycle[
+            ["assi", "enrolment_count", "ies_score", "intervention_priority"]
+        ]
+        .sort_values("ies_score", ascending=False)
+        .head(10)
+    )
 
-lifecycle["intervention_priority"] = lifecycle["ies_score"].apply(intervention_priority)
+    return lifecycle
 
 
-print("\nTop Intervention Efficiency Regions:")
-print(
-    lifecycle[
-        ["assi", "enrolment_count", "ies_score", "intervention_priority"]
-    ]
-    .sort_values("ies_score", ascending=False)
-    .head(10)
-)
-print("DEBUG — Columns before export:")
-print(lifecycle.columns.tolist())
+def score_lifecycle(lifecycle, rules=THRESHOLD_RULES, assi_config=DEFAULT_CONFIG,
+                    forecast=None):
+    """
+    STEPs 5-10.6: labels, ASSI, friction and IES on a cleaned table;
+    `forecast` (forecast.forecast_scores) feeds the bottleneck risk.
+    """
+    lifecycle = add_region_type(lifecycle, rules)
+    lifecycle = add_bottleneck_risk(lifecycle, rules, forecast)
+    lifecycle = add_dropout_risk(lifecycle)
+    lifecycle = add_recommended_action(lifecycle)
+    lifecycle = add_assi(lifecycle, assi_config)
+    lifecycle = add_friction(lifecycle, rules)
+    lifecycle = add_ies(lifecycle, rules)
+    return lifecycle
 
-lifecycle.to_csv("aadhaar_bottleneck_prediction.csv")
 
 # -------------------------------
-# STEP 11
+# STEP 3b: STATE / DISTRICT / PINCODE HIERARCHY
 # -------------------------------
 
+HIERARCHY = {
+    "pincode": ["state", "district", "pincode"],
+    "district": ["state", "district"],
+    "state": ["state"]
+}
 
 
+def combine_hierarchy(parts):
+    """
+    Merge per-dataset (state, district, pincode) sums into one table.
 
-# lifecycle.to_csv("aadhaar_bottleneck_prediction.csv")
-print("\nFinal bottleneck prediction data exported.")
-
-
-
+    District names are cleaned on the aggregated keys rather than the raw
+    rows, then rows that collapse onto the same cleaned key are merged.
+    """
+    keys = HIERARCHY["pincode"]
+    finest = pd.concat(parts, axis=1).fillna(0).reset_index()
 
+    # No-op on frames from load_raw; keeps direct callers canonical too
+    finest["state"] = canonical_states(finest["state"], report=False)
+    finest["district"] = canonical_districts(finest["state"], finest["district"])
+    finest = finest[finest["state"].notna()]
 
-# -------------------------------
-# STEP 12: QUERY A PARTICULAR STATE
-# -------------------------------
+    return finest.groupby(keys, dropna=False).sum()
 
-state_name = "andhra pradesh"   # change this state name
 
-if state_name in lifecycle.index:
-    print(f"\nDetails for {state_name.title()}:")
-    print(lifecycle.loc[state_name])
-else:
-    print(f"\nState '{state_name}' not found")
+@instrument.stage("aggregate")
+def aggregate_hierarchy(enrol, demo, bio):
+    """One multi-level (state, district, pincode) groupby per dataset."""
+    keys = HIERARCHY["pincode"]
+    parts = []
+    for df, name in zip((enrol, demo, bio), COUNT_NAMES):
+        # Same schema-mapped cohort columns as aggregate_states
+        parts.append(dataset_counts(
+            df.groupby(keys, observed=True, dropna=False)[count_columns(df.columns)]
+            .sum(),
+            name
+        ))
+    return combine_hierarchy(parts)
 
 
+def engine_hierarchy(folders, engine=DEFAULT_ENGINE):
+    """aggregate_hierarchy computed by a non-pandas engine (engines.py)."""
+    return combine_hierarchy(
+        dataset_sums(folders, HIERARCHY["pincode"], COUNT_NAMES, engine)
+    )
 
 
+def score_hierarchy(finest, rules=THRESHOLD_RULES, assi_config=DEFAULT_CONFIG,
+                    forecasts=None):
+    """
+    Roll pincode sums up to district and state, then score every level;
+    `forecasts` maps a level to its forecast scores.
+    """
+    forecasts = forecasts or {}
+    levels = {}
+    sums = finest
+    for level, keys in HIERARCHY.items():
+        # Each level is summed from the next finer one, never from raw rows
+        if level != "pincode":
+            sums = sums.groupby(level=keys, dropna=False).sum()
 
-def load_csvs_from_folder(folder_path):
-    csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
-    
-    df_list = []
-    for file in csv_files:
-        print("Reading:", file)   # optional but useful
-        df = pd.read_csv(file, encoding="latin1")
-        df_list.append(df)
-    
-    combined_df = pd.concat(df_list, ignore_index=True)
-    return combined_df
-
+        table = add_update_totals(sums.copy())
+        table = table[table["enrolment_count"] > 0]
 
+        print(f"\n{level.title()}-level lifecycle rows:", len(table))
+        levels[level] = score_lifecycle(
+            table, rules, assi_config, forecasts.get(level)
+        )
 
+    return levels
 
 
 # -------------------------------
-# STEP 13: SCATTER PLOT ANALYSIS
+# STEP 11: EXPORT
 # -------------------------------
 
-import matplotlib.pyplot as plt
+@instrument.stage("export")
+def export_lifecycle(lifecycle, output_path=OUTPUT_PATH):
+    print("Columns before export:")
+    print(lifecycle.columns.tolist())
 
-# Color mapping for risk levels
-color_map = {
-    "Low Risk": "green",
-    "Medium Risk": "orange",
-    "High Bottleneck Risk": "red"
-}
+    # Write-then-rename: the dashboard may be reading the previous file
+    lifecycle.to_csv(output_path + ".tmp")
+    os.replace(output_path + ".tmp", output_path)
+    print("\nFinal bottleneck prediction data exported.")
 
-colors = lifecycle["bottleneck_risk"].map(color_map)
 
-plt.figure(figsize=(10,6))
-plt.scatter(
-    lifecycle["enrolment_count"],
-    lifecycle["update_pressure"],
-    c=colors,
-    alpha=0.7
-)
-
-plt.xlabel("Enrolment Count")
-plt.ylabel("Update Pressure Index")
-plt.title("Enrolment vs Update Pressure (Bottleneck Detection)")
-
-# Add legend manually
-for label, color in color_map.items():
-    plt.scatter([], [], c=color, label=label)
-
-plt.legend(title="Bottleneck Risk")
-plt.grid(True)
-
-
-top_states = lifecycle.sort_values("update_pressure", ascending=False).head(5)
-
-for state in top_states.index:
-    plt.annotate(
-        state.title(),
-        (lifecycle.loc[state, "enrolment_count"],
-         lifecycle.loc[state, "update_pressure"]),
-        textcoords="offset points",
-        xytext=(5,5),
-        fontsize=9
-    )
+def level_output_path(output_path, level):
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}_{level}{ext or '.csv'}"
 
-plt.show()
 
+@instrument.stage("export")
+def export_levels(levels, output_path=OUTPUT_PATH):
+    # The state level is the main output; finer levels get a suffix
+    for level, table in levels.items():
+        path = output_path if level == "state" else level_output_path(output_path, level)
+        # Write-then-rename, as in export_lifecycle
+        table.to_csv(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        print(f"Exported {level}-level table:", path)
 
 
+# -------------------------------
+# STEP 12: QUERY A PARTICULAR STATE
+# -------------------------------
 
+def query_state(lifecycle, state_name, index=None):
+    # Hash lookup through the query layer (query.py); pass a prebuilt
+    # index when running several queries against the same table
+    table = lifecycle.reset_index()
+    if index is None:
+        index = build_index(table, metrics=())
 
+    row = lookup(index, table, state_name)
+    if row is not None:
+        print(f"\nDetails for {state_name.title()}:")
+        print(row.set_index("state").iloc[0])
+    else:
+        print(f"\nState '{state_name}' not found")
 
 
 # -------------------------------
 # STEP 13: UPDATE COMPOSITION ANALYSIS
 # -------------------------------
 
-# Share of update types
-lifecycle["biometric_share"] = (
-    lifecycle["biometric_updates"] / lifecycle["total_updates"]
-)
-
-lifecycle["demographic_share"] = (
-    lifecycle["demographic_updates"] / lifecycle["total_updates"]
-)
-
-print("\nUpdate Composition (Shares):")
-print(
-    lifecycle[[
-        "biometric_share",
-        "demographic_share"
-    ]].head()
-)
-
-
-
-
+def update_composition(lifecycle):
+    # Share of update types
+    shares = pd.DataFrame({
+        "biometric_share":
+            lifecycle["biometric_updates"] / lifecycle["total_updates"],
+        "demographic_share":
+            lifecycle["demographic_updates"] / lifecycle["total_updates"]
+    })
 
+    print("\nUpdate Composition (Shares):")
+    print(shares.head())
 
+    return shares
 
 
 # -------------------------------
-# STEP 14: PIE CHART – UPDATE COMPOSITION
+# PLOTS (matplotlib / geopandas are imported only when plotting)
 # -------------------------------
 
-total_biometric = lifecycle["biometric_updates"].sum()
-total_demographic = lifecycle["demographic_updates"].sum()
+# The figures themselves are drawn in report.py, shared with the
+# headless --report renderer; these show them in a blocking window
 
-plt.figure(figsize=(6,6))
-plt.pie(
-    [total_biometric, total_demographic],
-    labels=["Biometric Updates", "Demographic Updates"],
-    autopct="%1.1f%%",
-    startangle=90
-)
+def show_figure(name, lifecycle, **options):
+    import matplotlib.pyplot as plt
 
-plt.title("Overall Aadhaar Update Composition")
-plt.show()
+    draw, figsize, _ = FIGURES[name]
+    fig = plt.figure(figsize=figsize)
+    draw(fig, lifecycle, **options)
+    plt.show()
 
 
+def plot_update_ratio(lifecycle):
+    show_figure("update_ratio", lifecycle)
 
 
+def plot_assi(lifecycle):
+    show_figure("assi", lifecycle)
 
 
-# -------------------------------
-# STEP 15: INDIA MAP VISUALIZATION
-# -------------------------------
+def plot_friction(lifecycle):
+    show_figure("friction", lifecycle)
 
-import geopandas as gpd
-import matplotlib.pyplot as plt
 
-print("Loading India map...")
-
-# Load GeoJSON
-india_map = gpd.read_file("INDIA_STATES.geojson")
-
-print("India map loaded")
-print("Columns in GeoJSON:")
-print(india_map.columns)
-
-# 🔑 Automatically detect state-name column
-state_col = [c for c in india_map.columns if c.lower() != "geometry"][0]
-print("Using state column:", state_col)
-
-# Standardize state names
-india_map["state"] = india_map[state_col].str.strip().str.lower()
-
-# Prepare lifecycle data
-lifecycle_map = lifecycle.reset_index()
-lifecycle_map["state"] = lifecycle_map["state"].str.lower()
-
-# Fix common name mismatches
-state_fix = {
-    "nct of delhi": "delhi",
-    "andaman & nicobar islands": "andaman and nicobar islands",
-    "dadra and nagar haveli and daman and diu": "dadra and nagar haveli and daman and diu"
-}
-india_map["state"] = india_map["state"].replace(state_fix)
+# STEP 13: SCATTER PLOT ANALYSIS
+def plot_scatter(lifecycle):
+    show_figure("scatter", lifecycle)
 
-# Merge map with Aadhaar data
-merged_map = india_map.merge(
-    lifecycle_map,
-    on="state",
-    how="left"
-)
 
-print("Merge completed")
-
-# Plot map
-fig, ax = plt.subplots(1, 1, figsize=(10,12))
-merged_map.plot(
-    column="update_pressure",
-    cmap="Reds",
-    linewidth=0.8,
-    ax=ax,
-    edgecolor="black",
-    legend=True
-)
+# STEP 14: PIE CHART – UPDATE COMPOSITION
+def plot_composition(lifecycle):
+    show_figure("composition", lifecycle)
 
-ax.set_title(
-    "India Map: Aadhaar Enrollment Bottleneck Risk",
-    fontsize=14
-)
-ax.axis("off")
-plt.show()
 
+# STEP 15: INDIA MAP VISUALIZATION
+@instrument.stage("map")
+def plot_india_map(lifecycle, geojson_path=GEOJSON_PATH):
+    show_figure("india_map", lifecycle, geojson_path=geojson_path)
+
+
+def show_plots(lifecycle, geojson_path=GEOJSON_PATH):
+    plot_update_ratio(lifecycle)
+    plot_assi(lifecycle)
+    plot_friction(lifecycle)
+    plot_scatter(lifecycle)
+    plot_composition(lifecycle)
+    plot_india_map(lifecycle, geojson_path)
+
+
+# -------------------------------
+# PIPELINE
+# -------------------------------
+
+def score_states(enrol_state, demo_state, bio_state, rules=THRESHOLD_RULES,
+                 assi_config=DEFAULT_CONFIG, forecast=None):
+    """combine → clean → score the per-state sums."""
+    lifecycle = build_lifecycle(enrol_state, demo_state, bio_state)
+    lifecycle = clean_lifecycle(lifecycle)
+    return score_lifecycle(lifecycle, rules, assi_config, forecast)
+
+
+def run_pipeline(folders=(ENROL_DIR, DEMO_DIR, BIO_DIR), output_path=OUTPUT_PATH,
+                 loader=DEFAULT_LOADER, cache_dir=CACHE_DIR,
+                 incremental_dir=INCREMENTAL_DIR, hierarchy=False,
+                 timeseries=(), window=4, rules=THRESHOLD_RULES,
+                 assi_config=DEFAULT_CONFIG, bundle_dir=BUNDLE_DIR,
+                 engine=DEFAULT_ENGINE, forecast_weeks=0,
+                 forecast_method=DEFAULT_METHOD):
+    """
+    load → aggregate → clean → score → export; returns the state table.
+
+    `hierarchy` adds district/pincode levels and `timeseries` adds one
+    rolling table per bucket size ("daily", "weekly", "monthly").
+    `forecast_weeks` forecasts weekly demand per state (and district,
+    with `hierarchy`); its update pressure can raise bottleneck_risk.
+    All three need the raw tables, which are then loaded once and
+    shared; with an out-of-core `engine` the hierarchy is aggregated by
+    the engine and only the time series / forecasts need the raw tables.
+    The dashboard bundle is written to `bundle_dir` unless it is None.
+    """
+    need_raw = timeseries or forecast_weeks or (hierarchy and engine == "pandas")
+    if need_raw:
+        if loader not in RAW_LOADERS:
+            raise ValueError(
+                "hierarchy/timeseries/forecasts need the raw tables; "
+                f"use one of the {RAW_LOADERS} loaders"
+            )
+        enrol, demo, bio = load_raw(folders, loader, cache_dir)
+
+    forecasts = {}
+    if forecast_weeks:
+        for level in ("state", "district") if hierarchy else ("state",):
+            weeks, forecasts[level] = forecast_level(
+                enrol, demo, bio, level, forecast_weeks, forecast_method,
+                assi_config=assi_config
+            )
+            if output_path:
+                export_forecast(weeks, output_path, level)
+
+    if hierarchy:
+        if engine == "pandas":
+            finest = aggregate_hierarchy(enrol, demo, bio)
+        else:
+            finest = engine_hierarchy(folders, engine)
+        levels = score_hierarchy(finest, rules, assi_config, forecasts)
+        lifecycle = levels["state"]
+        if output_path:
+            export_levels(levels, output_path)
+    else:
+        if need_raw and engine == "pandas":
+            sums = aggregate_states(enrol, demo, bio)
+        else:
+            sums = load_state_sums(folders, loader, cache_dir, incremental_dir,
+                                   engine)
+        lifecycle = score_states(*sums, rules=rules, assi_config=assi_config,
+                                 forecast=forecasts.get("state"))
+        if output_path:
+            export_lifecycle(lifecycle, output_path)
+
+    if bundle_dir:
+        write_bundle(build_bundle(lifecycle), bundle_dir)
+
+    for name in timeseries:
+        table = state_timeseries(
+            enrol, demo, bio, FREQUENCIES[name], window, assi_config
+        )
+        if output_path:
+            export_timeseries(table, output_path, name)
+
+    return lifecycle
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Aadhaar lifecycle, ASSI and bottleneck prediction pipeline"
+    )
+    parser.add_argument("--enrolment-dir", default=ENROL_DIR)
+    parser.add_argument("--demographic-dir", default=DEMO_DIR)
+    parser.add_argument("--biometric-dir", default=BIO_DIR)
+    parser.add_argument("--output", default=OUTPUT_PATH,
+                        help="CSV path for the scored lifecycle table")
+    parser.add_argument("--loader", choices=LOADERS, default=DEFAULT_LOADER)
+    parser.add_argument("--engine", choices=ENGINES, default=DEFAULT_ENGINE,
+                        help="parallel: multi-core map-reduce over the shards; "
+                             "duckdb/polars: out-of-core aggregation (needs "
+                             "that package)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--incremental-dir", default=INCREMENTAL_DIR)
+    parser.add_argument("--hierarchy", action="store_true",
+                        help="also score district and pincode levels and "
+                             "export one table per level")
+    parser.add_argument("--timeseries", nargs="+", default=[],
+                        choices=list(FREQUENCIES),
+                        help="export rolling per-state time series at these "
+                             "bucket sizes")
+    parser.add_argument("--window", type=int, default=4,
+                        help="rolling window, in buckets, for --timeseries")
+    parser.add_argument("--forecast", type=int, default=0, metavar="WEEKS",
+                        help="forecast weekly demand this many weeks ahead "
+                             "per state (and district with --hierarchy); the "
+                             "forecast update pressure can raise "
+                             "bottleneck_risk")
+    parser.add_argument("--forecast-method", default=DEFAULT_METHOD,
+                        choices=METHODS)
+    parser.add_argument("--thresholds", default=None,
+                        help="JSON file overriding classification thresholds, "
+                             'e.g. {"bottleneck_risk": [2, 8]}')
+    parser.add_argument("--assi-config", default=None,
+                        help='JSON {"weights": {...}, "normalization": '
+                             '"minmax|zscore|rank"} replacing the default ASSI')
+    parser.add_argument("--bundle-dir", default=BUNDLE_DIR,
+                        help="where to write the dashboard artifact bundle")
+    parser.add_argument("--no-bundle", action="store_true",
+                        help="only write the CSV, no dashboard bundle")
+    parser.add_argument("--geojson", default=GEOJSON_PATH)
+    parser.add_argument("--state", default="andhra pradesh",
+                        help="state to print details for (STEP 12)")
+    parser.add_argument("--no-plots", action="store_true",
+                        help="headless run: skip matplotlib/geopandas entirely")
+    parser.add_argument("--report", default=None, metavar="DIR",
+                        help="render the figures to PNG/SVG and report.html "
+                             "in DIR (headless, in parallel) instead of "
+                             "showing them")
+    parser.add_argument("--metrics", default=None,
+                        help="write per-stage timings/memory here: JSON, or "
+                             "Prometheus text for a .prom path")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    folders = (args.enrolment_dir, args.demographic_dir, args.biometric_dir)
+
+    print("program started...")
+
+    if args.metrics:
+        instrument.enable()
+
+    needs_raw = (
+        args.timeseries or args.forecast
+        or (args.hierarchy and args.engine == "pandas")
+    )
+    if needs_raw and args.loader not in RAW_LOADERS:
+        raise SystemExit(
+            "--hierarchy/--timeseries/--forecast need district, pincode and "
+            "date columns; use --loader full or --loader cached"
+        )
+
+    lifecycle = run_pipeline(
+        folders=folders,
+        output_path=args.output,
+        loader=args.loader,
+        cache_dir=args.cache_dir,
+        incremental_dir=args.incremental_dir,
+        hierarchy=args.hierarchy,
+        timeseries=args.timeseries,
+        window=args.window,
+        rules=load_rules(args.thresholds),
+        assi_config=load_config(args.assi_config),
+        bundle_dir=None if args.no_bundle else args.bundle_dir,
+        engine=args.engine,
+        forecast_weeks=args.forecast,
+        forecast_method=args.forecast_method
+    )
 
+    query_state(lifecycle, args.state)
+    update_composition(lifecycle)
 
+    if args.report:
+        render_report(lifecycle, args.report, args.geojson)
+    elif not args.no_plots:
+        show_plots(lifecycle, args.geojson)
 
+    if args.metrics:
+        instrument.write_report(args.metrics)
 
+    return lifecycle
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import heapq
+
+import pandas as pd
+
+from query import region_keys
+from simulate import CENTER_EFFECT, MAX_CENTERS, center_factor
+from states import dedupe_states
+
+
+# -------------------------------
+# BUDGETED CENTER ALLOCATION
+# -------------------------------
+
+# total - minimise the sum of the metric over all regions
+# max   - minimise the worst region's metric
+OBJECTIVES = ("total", "max")
+
+
+def _factor(centers, effect):
+    # simulate.center_factor on plain floats; numpy scalars would dominate
+    # the cost of the heap loop
+    return max(0.0, 1 - centers * effect)
+
+
+def _priority(value, centers, effect, objective):
+    # Heap priority of giving one more center to a region that already
+    # has `centers`; None once another center changes nothing
+    now = value * _factor(centers, effect)
+    gain = now - value * _factor(centers + 1, effect)
+    if gain <= 0:
+        return None
+    return gain if objective == "total" else now
+
+
+def greedy_allocation(values, budget, effect=CENTER_EFFECT, objective="total",
+                      max_per_region=MAX_CENTERS):
+    """
+    Centers per region and the order regions were first picked.
+
+    Each center goes to the region with the largest marginal gain (or the
+    currently worst region for objective="max"), kept in a max-heap, so a
+    budget B over n regions costs O(n + B log n). The simulator's model is
+    linear: every center cuts the same amount until the metric reaches 0,
+    so gains never increase and greedy is optimal, but returns do not
+    diminish either. Without the `max_per_region` cap (default: the
+    what-if sweep's range) the top region would take every center.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective!r}")
+
+    centers = [0] * len(values)
+    first_pick = [None] * len(values)
+
+    heap = []
+    for i, value in enumerate(values):
+        priority = _priority(value, 0, effect, objective)
+        if priority is not None:
+            heap.append((-priority, i))
+    heapq.heapify(heap)
+
+    for step in range(budget):
+        if not heap:
+            break
+        _, i = heapq.heappop(heap)
+        centers[i] += 1
+        if first_pick[i] is None:
+            first_pick[i] = step + 1
+
+        if max_per_region is not None and centers[i] >= max_per_region:
+            continue
+        priority = _priority(values[i], centers[i], effect, objective)
+        if priority is not None:
+            heapq.heappush(heap, (-priority, i))
+
+    return centers, first_pick
+
+
+def allocate_centers(table, budget, metric="assi", effect=CENTER_EFFECT,
+                     objective="total", max_per_region=MAX_CENTERS):
+    """
+    Ranked deployment plan for `budget` centers over a scored table.
+
+    Works on the state table or a district/pincode export. Returns one
+    row per region that receives centers, in the order the greedy pass
+    first picked them.
+    """
+    keys = region_keys(table)
+    values = table[metric].fillna(0).astype(float).tolist()
+
+    centers, first_pick = greedy_allocation(
+        values, budget, effect, objective, max_per_region
+    )
+
+    plan = table[keys + [metric]].copy()
+    plan["centers"] = centers
+    plan[f"{metric}_after"] = table[metric] * center_factor(centers, effect)
+    plan["reduction"] = plan[metric] - plan[f"{metric}_after"]
+    plan["rank"] = first_pick
+
+    plan = plan[plan["centers"] > 0].sort_values("rank")
+    plan["rank"] = plan["rank"].rank(method="first").astype(int)
+    return plan.set_index("rank")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Allocate a fixed fleet of temporary centers"
+    )
+    parser.add_argument("--lifecycle", default="aadhaar_bottleneck_prediction.csv",
+                        help="state, district or pincode table from adhar.py")
+    parser.add_argument("--budget", type=int, required=True,
+                        help="number of centers/vans to deploy")
+    parser.add_argument("--metric", default="assi",
+                        choices=["assi", "update_pressure"])
+    parser.add_argument("--effect", type=float, default=CENTER_EFFECT,
+                        help="reduction per center (0.02 = 2%%)")
+    parser.add_argument("--objective", default="total", choices=OBJECTIVES)
+    parser.add_argument("--max-per-region", type=int, default=MAX_CENTERS,
+                        help="cap per region; the what-if model is only "
+                             "swept up to this many centers")
+    parser.add_argument("--output", default="deployment_plan.csv")
+    args = parser.parse_args(argv)
+
+    table = pd.read_csv(args.lifecycle)
+    if region_keys(table) == ["state"]:
+        table = dedupe_states(table)
+    plan = allocate_centers(
+        table, args.budget, args.metric, args.effect,
+        args.objective, args.max_per_region
+    )
+    plan.to_csv(args.output)
+
+    before = table[args.metric].sum()
+    print(f"Deployed {int(plan['centers'].sum())} of {args.budget} centers "
+          f"to {len(plan)} regions ({args.objective} {args.metric})")
+    print(f"Total {args.metric}: {before:.1f} → "
+          f"{before - plan['reduction'].sum():.1f}")
+    print("Written:", args.output)
+
+
+if __name__ == "__main__":
+    main()
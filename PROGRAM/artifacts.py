@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+import instrument
+from ingest import file_fingerprint
+from query import build_index, top_positions
+from states import dedupe_states, state_ids
+
+
+# -------------------------------
+# DASHBOARD ARTIFACT BUNDLE
+# -------------------------------
+
+# Directory written by adhar.py next to the CSV:
+#   table-<data_version>.parquet - typed lifecycle table (categorical labels)
+#   meta.json - KPIs, top-N rankings, state lookups and the table's name
+# meta.json is replaced last and atomically, so a reader that opens it
+# always finds the matching table.
+BUNDLE_DIR = "dashboard_bundle"
+TABLE_NAME = "table.parquet"    # bundles written before versioned tables
+META_NAME = "meta.json"
+CSV_PATH = "aadhaar_bottleneck_prediction.csv"
+
+TOP_N = 10
+RANKED_METRICS = ("assi", "ies_score", "update_pressure")
+CATEGORICAL_COLUMNS = (
+    "state",
+    "region_type",
+    "bottleneck_risk",
+    "dropout_risk",
+    "recommended_action",
+    "friction_level",
+    "intervention_priority"
+)
+
+
+def dashboard_table(lifecycle):
+    """State-level lifecycle as a flat table with the GeoJSON join key."""
+    table = lifecycle.reset_index()
+    table["state"] = table["state"].astype(str)
+
+    # Canonical LGD state ID, the integer join key for the map
+    table["state_id"] = state_ids(table["state"])
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in table:
+            table[column] = table[column].astype("category")
+    return table
+
+
+def compute_kpis(table):
+    # Every number the dashboard's metric cards show
+    return {
+        "assi_mean": float(table["assi"].mean()),
+        "assi_max": float(table["assi"].max()),
+        "high_stress_regions": int((table["assi"] >= 60).sum()),
+        "low_stress_regions": int((table["assi"] < 30).sum()),
+        "high_bottleneck_regions": int(
+            (table["bottleneck_risk"] == "High Bottleneck Risk").sum()
+        ),
+        "low_risk_regions": int((table["bottleneck_risk"] == "Low Risk").sum()),
+        "update_pressure_mean": float(table["update_pressure"].mean()),
+        "update_pressure_max": float(table["update_pressure"].max()),
+        "biometric_updates_total": float(table["biometric_updates"].sum()),
+        "demographic_updates_total": float(table["demographic_updates"].sum())
+    }
+
+
+def compute_rankings(index, top_n=TOP_N):
+    # Row positions of the top-N regions per metric, highest first
+    return {
+        metric: top_positions(index, metric, top_n)
+        for metric in index["order"]
+    }
+
+
+def data_version(table):
+    """Content hash of the table; keys every data-dependent cache."""
+    hashes = pd.util.hash_pandas_object(table, index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()[:12]
+
+
+def build_bundle(lifecycle, top_n=TOP_N):
+    table = dashboard_table(lifecycle)
+    states = table["state"].astype(str).tolist()
+    index = build_index(
+        table, [metric for metric in RANKED_METRICS if metric in table]
+    )
+
+    return {
+        "table": table,
+        "data_version": data_version(table),
+        "kpis": compute_kpis(table),
+        "rankings": compute_rankings(index, top_n),
+        "states": list(dict.fromkeys(states)),
+        # First row per state, for O(1) drill-down lookups
+        "positions": index["positions"]
+    }
+
+
+def bundle_index(bundle):
+    """
+    query.py index over the bundle's table, served from its stored
+    positions and top-N orders: nothing is sorted on load, and top-k
+    queries go up to the bundle's top_n.
+    """
+    return {
+        "keys": ["state"],
+        "positions": bundle["positions"],
+        "order": bundle["rankings"]
+    }
+
+
+@instrument.stage("export")
+def write_bundle(bundle, bundle_dir=BUNDLE_DIR):
+    os.makedirs(bundle_dir, exist_ok=True)
+    table_file = f"table-{bundle['data_version']}.parquet"
+    bundle["table"].to_parquet(os.path.join(bundle_dir, table_file), index=False)
+
+    meta = {key: value for key, value in bundle.items() if key != "table"}
+    meta["table_file"] = table_file
+    path = os.path.join(bundle_dir, META_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+    # Keep the newest previous table for readers that opened the old meta
+    old_tables = sorted(
+        (os.path.getmtime(p), p) for p in
+        (os.path.join(bundle_dir, n) for n in os.listdir(bundle_dir))
+        if os.path.basename(p).startswith("table")
+        and os.path.basename(p) != table_file
+    )
+    for _, stale in old_tables[:-1]:
+        os.remove(stale)
+
+    print("Dashboard bundle written:", bundle_dir)
+
+
+def read_bundle(bundle_dir=BUNDLE_DIR):
+    with open(os.path.join(bundle_dir, META_NAME), encoding="utf-8") as f:
+        bundle = json.load(f)
+    table_file = bundle.pop("table_file", TABLE_NAME)
+    bundle["table"] = pd.read_parquet(os.path.join(bundle_dir, table_file))
+    return bundle
+
+
+def source_fingerprint(bundle_dir=BUNDLE_DIR, csv_path=CSV_PATH):
+    """
+    Cheap change token for the dashboard's data source: one stat() of
+    meta.json (or of the CSV when there is no bundle).
+    """
+    for path in (os.path.join(bundle_dir, META_NAME), csv_path):
+        if os.path.exists(path):
+            fingerprint = file_fingerprint(path)
+            return (path, fingerprint["size"], fingerprint["mtime_ns"])
+    return None
+
+
+def load_or_build_bundle(bundle_dir=BUNDLE_DIR, csv_path=CSV_PATH):
+    """The pipeline's bundle, or one built from the CSV of an older run."""
+    if os.path.exists(os.path.join(bundle_dir, META_NAME)):
+        return read_bundle(bundle_dir)
+    table = dedupe_states(pd.read_csv(csv_path))
+    return build_bundle(table.set_index("state"))
@@ -0,0 +1,256 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from adhar import (
+    BIO_DIR,
+    DEMO_DIR,
+    ENROL_DIR,
+    LOADERS,
+    aggregate_states,
+    export_lifecycle,
+    load_raw,
+    load_state_sums,
+    score_states
+)
+from artifacts import build_bundle, write_bundle
+from ingest import find_csv_files, parallel_sums
+from instrument import high_water_bytes, peak_rss_mb, reset_peak_rss
+from schema import COUNT_NAMES, clean_column, count_columns, dataset_counts
+from synth import MANIFEST_NAME, generate
+
+
+# -------------------------------
+# PIPELINE BENCHMARK
+# -------------------------------
+
+def run_stage(results, name, rows, func, *args, verbose=False):
+    """
+    Time one stage; the pipeline's own prints are hidden unless verbose.
+    `rows` is the stage's input size, or a function of its output.
+    """
+    sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    # The stage's own peak (Linux), not the process high-water mark so far
+    per_stage = reset_peak_rss()
+    start = time.perf_counter()
+    with sink:
+        out = func(*args)
+    wall = time.perf_counter() - start
+    peak = high_water_bytes() if per_stage else None
+    if callable(rows):
+        rows = rows(out)
+
+    results.append({
+        "stage": name,
+        "wall_s": round(wall, 4),
+        "rows": rows,
+        "rows_per_s": round(rows / wall) if rows and wall > 0 else None,
+        "peak_rss_mb": None if peak is None else round(peak / 1024 ** 2, 1),
+        "process_peak_rss_mb": peak_rss_mb()
+    })
+    print(f"{name:>10}: {wall:8.3f} s  {rows or '?':>12} rows  "
+          f"peak RSS {results[-1]['peak_rss_mb']} MB "
+          f"(process {results[-1]['process_peak_rss_mb']} MB)")
+    return out
+
+
+def _map_merge(lifecycle):
+    from geo import load_state_geometries, merge_map_data
+    from states import state_ids
+
+    table = lifecycle.reset_index()
+    table["state_id"] = state_ids(table["state"])
+    return merge_map_data(load_state_geometries(width_px=1000), table)
+
+
+def benchmark(data_dir, loader="fast", cache_dir=None, map_merge=True,
+              verbose=False):
+    """
+    Time ingest → aggregate → score → export → map merge on data_dir.
+
+    Outputs go to a scratch directory that is removed afterwards. Pass a
+    persistent cache_dir to time the cached loader warm instead of cold.
+    """
+    folders = tuple(os.path.join(data_dir, d) for d in (ENROL_DIR, DEMO_DIR, BIO_DIR))
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    cache_dir = cache_dir or os.path.join(workdir, "cache")
+    results = []
+
+    manifest_path = os.path.join(data_dir, MANIFEST_NAME)
+    rows = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            rows = 3 * json.load(f)["rows"]
+
+    if loader not in ("stream", "incremental"):
+        raw = run_stage(results, "ingest", lambda raw: sum(map(len, raw)),
+                        load_raw, folders, loader, cache_dir, verbose=verbose)
+        rows = results[-1]["rows"]
+        sums = run_stage(results, "aggregate", rows, aggregate_states, *raw,
+                         verbose=verbose)
+        del raw
+    else:
+        # stream / incremental fold ingest and aggregation into one pass
+        sums = run_stage(results, "ingest", rows, load_state_sums,
+                         folders, loader, cache_dir, os.path.join(workdir, "state"),
+                         verbose=verbose)
+
+    lifecycle = run_stage(results, "score", len(sums[0]), score_states, *sums,
+                          verbose=verbose)
+
+    def export(lifecycle):
+        export_lifecycle(lifecycle, os.path.join(workdir, "out.csv"))
+        write_bundle(build_bundle(lifecycle), os.path.join(workdir, "bundle"))
+
+    run_stage(results, "export", len(lifecycle), export, lifecycle, verbose=verbose)
+
+    if map_merge:
+        run_stage(results, "map_merge", len(lifecycle), _map_merge, lifecycle,
+                  verbose=verbose)
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "data_dir": os.path.abspath(data_dir),
+        "loader": loader,
+        "input_rows": rows,
+        "total_wall_s": round(sum(r["wall_s"] for r in results), 4),
+        "process_peak_rss_mb": peak_rss_mb(),
+        "stages": results,
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+
+
+# -------------------------------
+# MULTI-CORE SCALING
+# -------------------------------
+
+def serial_sums(folders, keys):
+    # Single-process reference: load each folder whole, one groupby
+    results = []
+    for folder, name in zip(folders, COUNT_NAMES):
+        df = pd.concat(
+            [pd.read_csv(f, encoding="latin1") for f in find_csv_files(folder)],
+            ignore_index=True
+        )
+        df.columns = [clean_column(c) for c in df.columns]
+        results.append(dataset_counts(
+            df.groupby(keys, dropna=keys != ["state"])[count_columns(df.columns)]
+            .sum(),
+            name
+        ).sort_index())
+    return results
+
+
+def worker_counts(max_workers):
+    counts = [1]
+    while counts[-1] * 2 < max_workers:
+        counts.append(counts[-1] * 2)
+    if max_workers > 1:
+        counts.append(max_workers)
+    return counts
+
+
+def scaling_report(data_dir, keys=("state", "district"), max_workers=None):
+    """
+    Time the map-reduce aggregation at 1..N workers, check every result
+    against the single-process groupby and report speedup / efficiency.
+    """
+    folders = tuple(os.path.join(data_dir, d) for d in (ENROL_DIR, DEMO_DIR, BIO_DIR))
+    keys = list(keys)
+    max_workers = max_workers or os.cpu_count()
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    start = time.perf_counter()
+    with quiet:
+        reference = serial_sums(folders, keys)
+    serial_s = time.perf_counter() - start
+    print(f"single process: {serial_s:8.3f} s")
+
+    runs = []
+    for workers in worker_counts(max_workers):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = parallel_sums(folders, keys, COUNT_NAMES, workers)
+        wall = time.perf_counter() - start
+
+        for expected, got in zip(reference, result):
+            pd.testing.assert_frame_equal(got, expected)
+
+        base = runs[0]["wall_s"] if runs else wall
+        runs.append({
+            "workers": workers,
+            "wall_s": round(wall, 4),
+            "speedup": round(base / wall, 2),
+            "efficiency": round(base / wall / workers, 2),
+            "matches_serial": True
+        })
+        print(f"{workers:>3} workers: {wall:8.3f} s  speedup "
+              f"{runs[-1]['speedup']:5.2f}  efficiency {runs[-1]['efficiency']:.2f}")
+
+    return {
+        "data_dir": os.path.abspath(data_dir),
+        "keys": keys,
+        "serial_s": round(serial_s, 4),
+        "cpu_count": os.cpu_count(),
+        "runs": runs
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time each pipeline stage on real or synthetic shards"
+    )
+    parser.add_argument("--data", default="synthetic_data",
+                        help="folder holding the three api_data_aadhar_* folders")
+    parser.add_argument("--rows", type=int, default=None,
+                        help="generate this many rows per dataset into --data first")
+    parser.add_argument("--loader", default="fast", choices=LOADERS)
+    parser.add_argument("--cache-dir", default=None,
+                        help="persistent cache for --loader cached (warm runs)")
+    parser.add_argument("--no-map", action="store_true",
+                        help="skip the map merge stage (no geopandas needed)")
+    parser.add_argument("--verbose", action="store_true",
+                        help="show the pipeline's own output")
+    parser.add_argument("--scaling", action="store_true",
+                        help="instead: time the parallel (state, district) "
+                             "aggregation at 1..N workers and check it "
+                             "against the single-process result")
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    if args.rows:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate(args.data, args.rows)
+        print(f"Generated {args.rows} rows per dataset in {args.data}")
+
+    if args.scaling:
+        report = scaling_report(args.data, max_workers=args.max_workers)
+    else:
+        report = benchmark(args.data, args.loader, args.cache_dir,
+                           map_merge=not args.no_map, verbose=args.verbose)
+        print(f"Total {report['total_wall_s']} s")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print("Written:", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------
+# THRESHOLD TABLES (STEPs 5, 7, 10.5, 10.6)
+# -------------------------------
+
+# Each rule labels `column` by comparing it against `thresholds` in order:
+#   "<"  : first threshold with value < t wins (ascending thresholds)
+#   ">=" : first threshold with value >= t wins (descending thresholds)
+# Values matching no threshold (including NaN) get the last label.
+THRESHOLD_RULES = {
+    "region_type": {
+        "column": "update_ratio",
+        "op": "<",
+        "thresholds": [1, 5],
+        "labels": [
+            "Stable Identity Region",
+            "Moderate Update Region",
+            "High Mobility / High Correction Region"
+        ]
+    },
+    "bottleneck_risk": {
+        "column": "update_pressure",
+        "op": "<",
+        "thresholds": [1, 5],
+        "labels": ["Low Risk", "Medium Risk", "High Bottleneck Risk"]
+    },
+    "friction_level": {
+        "column": "friction_score",
+        "op": "<",
+        "thresholds": [30, 60],
+        "labels": ["Low Friction", "Moderate Friction", "High Friction"]
+    },
+    "intervention_priority": {
+        "column": "ies_score",
+        "op": ">=",
+        "thresholds": [70, 40],
+        "labels": [
+            "🔥 High ROI Intervention Zone",
+            "⚠️ Medium ROI Zone",
+            "Low ROI Zone"
+        ]
+    }
+}
+
+# STEP 9: bottleneck risk → recommended action
+RECOMMENDED_ACTIONS = {
+    "High Bottleneck Risk": "Deploy temporary enrolment centres / vans",
+    "Medium Risk": "Increase staffing during peak hours",
+    "Low Risk": "No immediate intervention required"
+}
+
+HIGH_RISK = "High Bottleneck Risk"
+
+
+def classify(values, rule):
+    """Label a numeric Series with one vectorised pass; categorical output."""
+    x = np.asarray(values, dtype=float)
+
+    if rule["op"] == "<":
+        conditions = [x < t for t in rule["thresholds"]]
+    elif rule["op"] == ">=":
+        conditions = [x >= t for t in rule["thresholds"]]
+    else:
+        raise ValueError(f"Unknown threshold op: {rule['op']!r}")
+
+    codes = np.select(
+        conditions,
+        np.arange(len(conditions)),
+        default=len(conditions)
+    )
+    labels = pd.Categorical.from_codes(codes, categories=rule["labels"])
+    return pd.Series(labels, index=values.index, name=values.name)
+
+
+def escalate_risk(current, forecast):
+    """
+    The worse of two risk labellings with the same categories, per
+    region; a missing forecast label keeps the current one.
+    """
+    codes = np.maximum(
+        current.cat.codes.to_numpy(),
+        forecast.astype(current.dtype).cat.codes.to_numpy()
+    )
+    labels = pd.Categorical.from_codes(codes, dtype=current.dtype)
+    return pd.Series(labels, index=current.index, name=current.name)
+
+
+def recommend_actions(risk):
+    # Maps the categories, not every row
+    return risk.astype("category").map(RECOMMENDED_ACTIONS)
+
+
+def dropout_risk(risk, enrolment_count):
+    # High bottleneck risk with below-median enrolment (STEP 8)
+    high = (risk == HIGH_RISK).to_numpy() & (
+        enrolment_count < enrolment_count.median()
+    ).to_numpy()
+    labels = pd.Categorical.from_codes(
+        high.astype(np.int8),
+        categories=["Low Dropout Risk", "High Dropout Risk"]
+    )
+    return pd.Series(labels, index=risk.index)
+
+
+def check_order(name, op, thresholds):
+    # First match wins, so out-of-order thresholds leave labels unreachable
+    steps = np.diff(np.asarray(thresholds, dtype=float))
+    ascending = op == "<"
+    if not (steps > 0 if ascending else steps < 0).all():
+        raise ValueError(
+            f"{name} thresholds must be strictly "
+            f"{'ascending' if ascending else 'descending'} for "
+            f"op {op!r}, got {list(thresholds)}"
+        )
+
+
+def load_rules(path=None):
+    """THRESHOLD_RULES with thresholds overridden from a JSON file."""
+    rules = {name: dict(rule) for name, rule in THRESHOLD_RULES.items()}
+    if path is None:
+        return rules
+
+    with open(path, encoding="utf-8") as f:
+        overrides = json.load(f)
+
+    # e.g. {"bottleneck_risk": [2, 8], "friction_level": [25, 50]}
+    for name, thresholds in overrides.items():
+        if name not in rules:
+            raise ValueError(f"Unknown classification rule: {name!r}")
+        if len(thresholds) != len(rules[name]["thresholds"]):
+            raise ValueError(
+                f"{name} needs {len(rules[name]['thresholds'])} thresholds"
+            )
+        check_order(name, rules[name]["op"], thresholds)
+        rules[name]["thresholds"] = list(thresholds)
+    return rules
@@ -1,7 +1,24 @@
+import io
+
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import geopandas as gpd
+
+from artifacts import bundle_index, load_or_build_bundle, source_fingerprint
+from geo import (
+    GEOJSON_PATH,
+    MAP_METRICS,
+    load_state_geometries,
+    merge_map_data,
+    render_choropleth,
+    unmatched_map_states
+)
+from allocate import OBJECTIVES, allocate_centers
+from query import lookup, top_k
+from simulate import (
+    CENTER_EFFECT,
+    MAX_CENTERS,
+    national_view,
+    simulate_interventions
+)
 
 # --------------------------------
 # PAGE CONFIG
@@ -17,399 +34,501 @@ st.caption("Service Stress • Bottlenecks • Decision Support")
 # --------------------------------
 # LOAD READY DATA
 # --------------------------------
-@st.cache_data
-def load_data():
-    return pd.read_csv("aadhaar_bottleneck_prediction.csv")
+# Bundle written by adhar.py: typed table + precomputed KPIs. Loaded
+# once per data-source fingerprint (a stat() of meta.json / the CSV), so
+# a pipeline re-run is picked up without restarting the server. Only the
+# current bundle is kept; every cache below is keyed by its data_version,
+# the geometry cache is not.
+RELOAD_SECONDS = 30
 
-df = load_data()
 
+@st.cache_resource(max_entries=1)
+def load_data(fingerprint):
+    return load_or_build_bundle()
 
+fingerprint = source_fingerprint()
+bundle = load_data(fingerprint)
+df = bundle["table"]
+kpis = bundle["kpis"]
+data_version = bundle["data_version"]
 
 
+# Polls the fingerprint in the background; a changed source reruns the
+# whole app, which then loads the new bundle in one swap
+@st.fragment(run_every=RELOAD_SECONDS)
+def watch_data_source(loaded):
+    if source_fingerprint() != loaded:
+        st.rerun()
 
+watch_data_source(fingerprint)
 
-st.subheader("📊 Aadhaar Service Stress Overview")
 
-c1, c2, c3, c4 = st.columns(4)
+# Region hash index + top-10 orders precomputed in the bundle (query.py
+# structures): every lookup below is O(1) and every top-10 table O(k)
+index = bundle_index(bundle)
 
-c1.metric("Average ASSI", round(df["assi"].mean(), 1))
-c2.metric("Maximum ASSI", round(df["assi"].max(), 1))
-c3.metric("High-Stress Regions", df[df["assi"] >= 60].shape[0])
-c4.metric("Low-Stress Regions", df[df["assi"] < 30].shape[0])
 
+# Every state x 0..MAX_CENTERS x effect size, once per data version;
+# the simulators below only look values up
+@st.cache_data(max_entries=2)
+def load_simulation(data_version, _table):
+    return simulate_interventions(_table)
 
 
-st.subheader("🚨 Top States by Aadhaar Service Stress Index (ASSI)")
+# --------------------------------
+# CHARTS
+# --------------------------------
+# Matplotlib is imported on the first chart actually shown, and each
+# chart is rasterised once per data version; reruns reuse the PNG bytes.
+# A bare Figure, not pyplot: no global state, nothing left open.
+def figure_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    return buf.getvalue()
 
-top_assi = df.sort_values("assi", ascending=False).head(10)
 
-st.dataframe(
-    top_assi[
-        ["state", "assi", "bottleneck_risk", "recommended_action"]
-    ]
-)
+@st.cache_data(max_entries=8)
+def top10_bar_chart(data_version, metric, ylabel, title, color, _table):
+    from matplotlib.figure import Figure
 
+    fig = Figure(figsize=(8, 4))
+    ax = fig.subplots()
+    _table.set_index("state")[metric].plot(kind="bar", ax=ax, color=color)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    return figure_png(fig)
 
 
-st.subheader("📊 ASSI Distribution (Top 10 States)")
+@st.cache_data(max_entries=2)
+def pressure_scatter(data_version, _table):
+    from matplotlib.figure import Figure
 
-fig, ax = plt.subplots(figsize=(8,4))
-top_assi.set_index("state")["assi"].plot(kind="bar", ax=ax)
-ax.set_ylabel("ASSI (0–100)")
-ax.set_title("Highest Aadhaar Service Stress Levels")
-st.pyplot(fig)
+    fig = Figure()
+    ax = fig.subplots()
+    ax.scatter(
+        _table["enrolment_count"],
+        _table["update_pressure"],
+        alpha=0.6
+    )
+    ax.set_xlabel("Enrolment Count")
+    ax.set_ylabel("Update Pressure")
+    return figure_png(fig)
 
 
+@st.cache_data(max_entries=2)
+def update_composition_pie(data_version, _kpis):
+    from matplotlib.figure import Figure
 
-# -------------------------------
-# ASSI WHAT-IF POLICY SIMULATOR
-# -------------------------------
+    fig = Figure()
+    ax = fig.subplots()
+    ax.pie(
+        [
+            _kpis["biometric_updates_total"],
+            _kpis["demographic_updates_total"]
+        ],
+        labels=["Biometric Updates", "Demographic Updates"],
+        autopct="%1.1f%%",
+        startangle=90
+    )
+    return figure_png(fig)
 
-st.subheader("🎛 ASSI What-If Policy Simulator")
 
-# State selection (unique key to avoid Streamlit errors)
-state = st.selectbox(
-    "Select State",
-    df["state"].unique(),
-    key="assi_policy_state"
-)
+# --------------------------------
+# KPI METRICS
+# --------------------------------
+# Precomputed in the bundle, so the headline numbers paint before any
+# section below has done work
+st.subheader("📊 Aadhaar Service Stress Overview")
 
-# Slider for intervention simulation
-centers = st.slider(
-    "Add Temporary Enrollment Centers",
-    min_value=0,
-    max_value=10,
-    value=5,
-    step=1
-)
+c1, c2, c3, c4 = st.columns(4)
 
-# Fetch current ASSI
-current_assi = df.loc[df["state"] == state, "assi"].values[0]
+c1.metric("Average ASSI", round(kpis["assi_mean"], 1))
+c2.metric("Maximum ASSI", round(kpis["assi_max"], 1))
+c3.metric("High-Stress Regions", kpis["high_stress_regions"])
+c4.metric("Low-Stress Regions", kpis["low_stress_regions"])
 
-# Policy assumption: each center reduces ASSI by 2%
-new_assi = current_assi * (1 - centers * 0.02)
+st.subheader("📊 National Overview")
 
-# Display metrics
-c1, c2 = st.columns(2)
+c1, c2, c3, c4 = st.columns(4)
 
 c1.metric(
-    "Current ASSI",
-    round(current_assi, 1)
+    "High Bottleneck Regions",
+    kpis["high_bottleneck_regions"]
 )
 
 c2.metric(
-    "Post-Intervention ASSI",
-    round(new_assi, 1),
-    delta=round(new_assi - current_assi, 1)
+    "Average Update Pressure",
+    round(kpis["update_pressure_mean"], 2)
 )
 
-st.caption(
-    "Assumption: Each temporary enrollment center reduces ASSI by ~2% (illustrative policy simulation)."
+c3.metric(
+    "Maximum Update Pressure",
+    round(kpis["update_pressure_max"], 2)
 )
 
+c4.metric(
+    "Low Risk Regions",
+    kpis["low_risk_regions"]
+)
 
 
+# --------------------------------
+# SECTIONS
+# --------------------------------
+# Lazy tabs: a run executes only the open tab's code, so the map (and
+# geopandas with it) loads the first time the Map tab is opened. Widgets
+# inside a section are wrapped in st.fragment, so changing one reruns
+# that section alone, not the whole page.
+SECTIONS = [
+    "🚨 Stress",
+    "🎯 Efficiency",
+    "🔍 Drill Down",
+    "📈 Visuals",
+    "🗺️ Map",
+    "🚐 Planner",
+    "📄 Data"
+]
+
+stress_tab, efficiency_tab, drilldown_tab, visuals_tab, map_tab, \
+    planner_tab, data_tab = st.tabs(SECTIONS, key="section", on_change="rerun")
 
 
+# -------------------------------
+# ASSI WHAT-IF POLICY SIMULATOR
+# -------------------------------
+@st.fragment
+def assi_simulator():
+    st.subheader("🎛 ASSI What-If Policy Simulator")
 
+    simulation = load_simulation(data_version, df)
 
-if "ies_score" not in df.columns:
-    st.error("Intervention Efficiency data missing. Please re-run adhar.py.")
-    st.stop()
-
+    # State selection (unique key to avoid Streamlit errors)
+    state = st.selectbox(
+        "Select State",
+        bundle["states"],
+        key="assi_policy_state"
+    )
 
+    # Slider for intervention simulation
+    centers = st.slider(
+        "Add Temporary Enrollment Centers",
+        min_value=0,
+        max_value=MAX_CENTERS,
+        value=5,
+        step=1
+    )
 
+    # Fetch current ASSI
+    current_assi = lookup(index, df, state)["assi"].iat[0]
 
+    # Policy assumption: each center reduces ASSI by 2%
+    new_assi = simulation.at[(state, centers, CENTER_EFFECT), "assi"]
 
-st.subheader("🎯 Intervention Efficiency Analysis (High-ROI Zones)")
+    # Display metrics
+    c1, c2 = st.columns(2)
 
-top_ies = df.sort_values("ies_score", ascending=False).head(10)
+    c1.metric(
+        "Current ASSI",
+        round(current_assi, 1)
+    )
 
-st.dataframe(
-    top_ies[
-        [
-            "state",
-            "assi",
-            "ies_score",
-            "intervention_priority",
-            "recommended_action"
-        ]
-    ],
-    use_container_width=True
-)
+    c2.metric(
+        "Post-Intervention ASSI",
+        round(new_assi, 1),
+        delta=round(new_assi - current_assi, 1)
+    )
 
+    st.caption(
+        "Assumption: Each temporary enrollment center reduces ASSI by ~2% (illustrative policy simulation)."
+    )
 
+    # Sensitivity: ASSI for 0..MAX_CENTERS centers under each assumed effect
+    sensitivity = simulation.loc[state, "assi"].unstack("effect")
+    sensitivity.columns = [f"{e:.0%} per center" for e in sensitivity.columns]
+    st.line_chart(sensitivity)
 
 
-fig, ax = plt.subplots(figsize=(8,4))
+if stress_tab.open:
+    with stress_tab:
+        st.subheader("🚨 Top States by Aadhaar Service Stress Index (ASSI)")
 
-top_ies.set_index("state")["ies_score"].plot(
-    kind="bar",
-    ax=ax,
-    color="green"
-)
+        top_assi = top_k(index, df, "assi")
 
-ax.set_ylabel("Intervention Efficiency Score (0–100)")
-ax.set_title("Top High-ROI Aadhaar Intervention Regions")
+        st.dataframe(
+            top_assi[
+                ["state", "assi", "bottleneck_risk", "recommended_action"]
+            ]
+        )
 
-st.pyplot(fig)
+        st.subheader("📊 ASSI Distribution (Top 10 States)")
 
+        st.image(top10_bar_chart(
+            data_version, "assi", "ASSI (0–100)",
+            "Highest Aadhaar Service Stress Levels", None, top_assi
+        ))
 
+        assi_simulator()
 
 
 # --------------------------------
-# KPI METRICS
+# INTERVENTION EFFICIENCY
 # --------------------------------
-st.subheader("📊 National Overview")
-
-c1, c2, c3, c4 = st.columns(4)
+if efficiency_tab.open:
+    with efficiency_tab:
+        if "ies_score" not in df.columns:
+            st.error("Intervention Efficiency data missing. Please re-run adhar.py.")
+        else:
+            st.subheader("🎯 Intervention Efficiency Analysis (High-ROI Zones)")
+
+            top_ies = top_k(index, df, "ies_score")
+
+            st.dataframe(
+                top_ies[
+                    [
+                        "state",
+                        "assi",
+                        "ies_score",
+                        "intervention_priority",
+                        "recommended_action"
+                    ]
+                ],
+                use_container_width=True
+            )
+
+            st.image(top10_bar_chart(
+                data_version, "ies_score", "Intervention Efficiency Score (0–100)",
+                "Top High-ROI Aadhaar Intervention Regions", "green", top_ies
+            ))
 
-c1.metric(
-    "High Bottleneck Regions",
-    df[df["bottleneck_risk"] == "High Bottleneck Risk"].shape[0]
-)
-
-c2.metric(
-    "Average Update Pressure",
-    round(df["update_pressure"].mean(), 2)
-)
 
-c3.metric(
-    "Maximum Update Pressure",
-    round(df["update_pressure"].max(), 2)
-)
-
-c4.metric(
-    "Low Risk Regions",
-    df[df["bottleneck_risk"] == "Low Risk"].shape[0]
-)
-
-
-
-
-st.subheader("🔍 State-wise Drill Down")
+# --------------------------------
+# STATE DRILL DOWN
+# --------------------------------
+@st.fragment
+def state_drilldown():
+    st.subheader("🔍 State-wise Drill Down")
+
+    # State selector (UNIQUE KEY is IMPORTANT)
+    selected_state = st.selectbox(
+        "Select a State to View Details",
+        sorted(bundle["states"]),
+        key="state_drilldown_selector"
+    )
 
-# State selector (UNIQUE KEY is IMPORTANT)
-selected_state = st.selectbox(
-    "Select a State to View Details",
-    sorted(df["state"].unique()),
-    key="state_drilldown_selector"
-)
+    # Look up the selected row
+    state_data = lookup(index, df, selected_state)
 
-# Filter data
-state_data = df[df["state"] == selected_state]
+    # ----------------------------
+    # KPI CARDS FOR SELECTED STATE
+    # ----------------------------
+    st.markdown(f"### 📍 {selected_state.title()} – Service Stress Snapshot")
 
-# ----------------------------
-# KPI CARDS FOR SELECTED STATE
-# ----------------------------
-st.markdown(f"### 📍 {selected_state.title()} – Service Stress Snapshot")
+    c1, c2, c3 = st.columns(3)
 
-c1, c2, c3 = st.columns(3)
+    c1.metric("ASSI Score", round(state_data["assi"].values[0], 1))
+    c2.metric("Bottleneck Risk", state_data["bottleneck_risk"].values[0])
+    c3.metric("Update Pressure", round(state_data["update_pressure"].values[0], 2))
 
-c1.metric("ASSI Score", round(state_data["assi"].values[0], 1))
-c2.metric("Bottleneck Risk", state_data["bottleneck_risk"].values[0])
-c3.metric("Update Pressure", round(state_data["update_pressure"].values[0], 2))
+    # ----------------------------
+    # DETAILED TABLE
+    # ----------------------------
+    st.markdown("### 📊 Detailed Metrics")
 
-# ----------------------------
-# DETAILED TABLE
-# ----------------------------
-st.markdown("### 📊 Detailed Metrics")
+    st.dataframe(
+        state_data[[
+            "enrolment_count",
+            "demographic_updates",
+            "biometric_updates",
+            "update_pressure",
+            "assi",
+            "bottleneck_risk",
+            "recommended_action"
+        ]]
+    )
+    st.markdown("### 🧠 Stress Contributors")
 
-st.dataframe(
-    state_data[[
+    contributors = state_data[[
         "enrolment_count",
         "demographic_updates",
-        "biometric_updates",
-        "update_pressure",
-        "assi",
-        "bottleneck_risk",
-        "recommended_action"
-    ]]
-)
-st.markdown("### 🧠 Stress Contributors")
-
-contributors = state_data[[
-    "enrolment_count",
-    "demographic_updates",
-    "biometric_updates"
-]].T
+        "biometric_updates"
+    ]].T
 
-contributors.columns = ["Value"]
-st.bar_chart(contributors)
+    contributors.columns = ["Value"]
+    st.bar_chart(contributors)
 
 
+if drilldown_tab.open:
+    with drilldown_tab:
+        state_drilldown()
 
 
+# --------------------------------
+# VISUALS
+# --------------------------------
+if visuals_tab.open:
+    with visuals_tab:
+        left, right = st.columns(2)
 
+        with left:
+            st.subheader("📈 Enrolment vs Update Pressure")
+            st.image(pressure_scatter(data_version, df))
 
+        with right:
+            st.subheader("🧩 Update Composition")
+            st.image(update_composition_pie(data_version, kpis))
 
 
+# --------------------------------
+# INDIA MAP
+# --------------------------------
+MAP_FIGSIZE = (8, 10)
+MAP_DPI = 100
 
 
+# Geometry: parsed once per server and never mutated. Uses the simplified
+# level of detail for the rendered width when the geometry store exists.
+@st.cache_resource
+def load_india_map():
+    return load_state_geometries(GEOJSON_PATH, width_px=MAP_FIGSIZE[0] * MAP_DPI)
 
 
-# --------------------------------
-# VISUALS
-# --------------------------------
-left, right = st.columns(2)
+# Polygons joined with the scored table: once per data version (the
+# previous version is evicted after a reload; the geometry is reused)
+@st.cache_resource(max_entries=2)
+def load_merged_map(data_version, _table):
+    return merge_map_data(load_india_map(), _table)
 
-with left:
-    st.subheader("📈 Enrolment vs Update Pressure")
-    fig, ax = plt.subplots()
-    ax.scatter(
-        df["enrolment_count"],
-        df["update_pressure"],
-        alpha=0.6
-    )
-    ax.set_xlabel("Enrolment Count")
-    ax.set_ylabel("Update Pressure")
-    st.pyplot(fig)
 
-with right:
-    st.subheader("🧩 Update Composition")
-    fig2, ax2 = plt.subplots()
-    ax2.pie(
-        [
-            df["biometric_updates"].sum(),
-            df["demographic_updates"].sum()
-        ],
-        labels=["Biometric Updates", "Demographic Updates"],
-        autopct="%1.1f%%",
-        startangle=90
+# Rendered choropleth bytes per (data version, metric); slider moves
+# and other widget changes never re-rasterise the map
+@st.cache_data(max_entries=2 * len(MAP_METRICS))
+def render_map(data_version, metric, _table):
+    return render_choropleth(
+        load_merged_map(data_version, _table),
+        metric,
+        figsize=MAP_FIGSIZE,
+        dpi=MAP_DPI
     )
-    st.pyplot(fig2)
-    
-    
-    
-    
-    st.subheader("🗺️ India Map – Aadhaar Service Stress Index (ASSI)")
 
-@st.cache_data
-def load_india_map():
-    india = gpd.read_file("INDIA_STATES.geojson")
 
-    # Automatically detect state-name column
-    state_col = [c for c in india.columns if c.lower() != "geometry"][0]
-
-    india["state"] = india[state_col].str.strip().str.lower()
-    return india
-
-india_map = load_india_map()
+@st.fragment
+def india_map():
+    st.subheader("🗺️ India Map – Aadhaar Service Stress Index (ASSI)")
 
-# Prepare ASSI data
-map_df = df.copy()
-map_df["state"] = map_df["state"].str.lower()
+    map_metric = st.radio(
+        "Map metric",
+        list(MAP_METRICS),
+        format_func=lambda m: MAP_METRICS[m][1],
+        horizontal=True,
+        key="map_metric"
+    )
 
-# Fix common name mismatches
-state_fix = {
-    "nct of delhi": "delhi",
-    "andaman & nicobar islands": "andaman and nicobar islands",
-    "dadra and nagar haveli and daman and diu":
-        "dadra and nagar haveli and daman and diu"
-}
+    st.image(render_map(data_version, map_metric, df))
 
-india_map["state"] = india_map["state"].replace(state_fix)
-map_df["state"] = map_df["state"].replace(state_fix)
+    # States the join could not place are listed rather than silently dropped
+    no_polygon, _ = unmatched_map_states(load_india_map(), df)
+    if no_polygon:
+        st.caption("Not shown on the map (no polygon): " + ", ".join(
+            s.title() for s in no_polygon
+        ))
 
-# Merge map with ASSI data
-merged = india_map.merge(
-    map_df,
-    on="state",
-    how="left"
-)
 
-# Plot map
-fig, ax = plt.subplots(figsize=(8, 10))
-
-merged.plot(
-    column="assi",
-    cmap="Reds",
-    linewidth=0.6,
-    ax=ax,
-    edgecolor="black",
-    legend=True,
-    legend_kwds={"label": "ASSI (0–100)"}
-)
+if map_tab.open:
+    with map_tab:
+        india_map()
 
-ax.set_title(
-    "India: Aadhaar Service Stress Index (ASSI)",
-    fontsize=14
-)
-ax.axis("off")
-
-st.pyplot(fig)
-
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
 
 # --------------------------------
 # INTERVENTION PLANNER
 # --------------------------------
-st.subheader("🚨 Intervention Planner (Top 10 Regions)")
 
-top10 = df.sort_values(
-    "update_pressure",
-    ascending=False
-).head(10)
+# One greedy pass per (data version, budget, objective)
+@st.cache_data(max_entries=64)
+def plan_fleet(data_version, budget, objective, _table):
+    return allocate_centers(
+        _table, budget, objective=objective, max_per_region=MAX_CENTERS
+    )
 
-st.dataframe(
-    top10[
-        [
-            "state",
-            "update_pressure",
-            "bottleneck_risk",
-            "recommended_action"
-        ]
-    ]
-)
 
+@st.fragment
+def fleet_allocation():
+    st.subheader("🚐 Fleet Allocation (Fixed Budget)")
+
+    c1, c2 = st.columns(2)
+    budget = c1.number_input(
+        "Centers / vans available", min_value=0, max_value=5000, value=20,
+        key="fleet_budget"
+    )
+    objective = c2.radio(
+        "Minimise", OBJECTIVES,
+        format_func={"total": "Total ASSI", "max": "Worst-state ASSI"}.get,
+        horizontal=True,
+        key="fleet_objective"
+    )
 
+    st.dataframe(plan_fleet(data_version, int(budget), objective, df))
 
 
 # WHAT-IF POLICY SIMULATOR
 # --------------------------------
-st.subheader("🎛 What-If Policy Simulator")
+@st.fragment
+def pressure_simulator():
+    st.subheader("🎛 What-If Policy Simulator")
 
-state = st.selectbox(
-    "Select State",
-    df["state"].unique(),
-    key="policy_state_select"
-)
+    simulation = load_simulation(data_version, df)
 
-centers = st.slider(
-    "Add Temporary Centers",
-    0, 10, 5,
-    key="policy_centers_slider"
-)
+    state = st.selectbox(
+        "Select State",
+        bundle["states"],
+        key="policy_state_select"
+    )
+
+    centers = st.slider(
+        "Add Temporary Centers",
+        0, MAX_CENTERS, 5,
+        key="policy_centers_slider"
+    )
 
-current_pressure = df.loc[
-    df["state"] == state, "update_pressure"
-].values[0]
+    current_pressure = lookup(index, df, state)["update_pressure"].iat[0]
 
-# Conservative assumption
-new_pressure = current_pressure * (1 - centers * 0.02)
+    # Conservative assumption
+    new_pressure = simulation.at[(state, centers, CENTER_EFFECT), "update_pressure"]
+
+    c1, c2 = st.columns(2)
+    c1.metric("Current Pressure", round(current_pressure, 2))
+    c2.metric("Post-Intervention Pressure", round(new_pressure, 2))
+
+    # National view: mean pressure if every state gets the same number of centers
+    national = national_view(simulation)["update_pressure"].unstack("effect")
+    national.columns = [f"{e:.0%} per center" for e in national.columns]
+    st.caption("Average update pressure if every state adds the same number of centers")
+    st.line_chart(national)
 
-c1, c2 = st.columns(2)
-c1.metric("Current Pressure", round(current_pressure, 2))
-c2.metric("Post-Intervention Pressure", round(new_pressure, 2))
-# --------------------------------
 
+if planner_tab.open:
+    with planner_tab:
+        st.subheader("🚨 Intervention Planner (Top 10 Regions)")
 
+        top10 = top_k(index, df, "update_pressure")
 
+        st.dataframe(
+            top10[
+                [
+                    "state",
+                    "update_pressure",
+                    "bottleneck_risk",
+                    "recommended_action"
+                ]
+            ]
+        )
 
+        fleet_allocation()
+        pressure_simulator()
 
 
 # --------------------------------
 # DATA VIEW (OPTIONAL)
 # --------------------------------
-with st.expander("📄 View Full Data"):
-    st.dataframe(df)
+if data_tab.open:
+    with data_tab:
+        st.dataframe(df)
@@ -0,0 +1,197 @@
+import glob
+import os
+
+import pandas as pd
+
+import instrument
+from ingest import find_csv_files, parallel_sums
+from schema import clean_column, count_columns, dataset_counts
+
+
+# -------------------------------
+# OUT-OF-CORE AGGREGATION ENGINES
+# -------------------------------
+
+# pandas   - the in-memory loaders in adhar.py / ingest.py
+# parallel - pandas map-reduce: per-shard partial sums in a process
+#            pool, tree-merged (ingest.parallel_sums; CSV shards only)
+# duckdb   - embedded DuckDB query; spills to disk past its memory limit
+# polars   - Polars LazyFrame run on the streaming engine
+# The out-of-core engines scan the shards lazily, parse only the key and
+# count columns (projection pushdown) and aggregate multi-threaded.
+ENGINES = ("pandas", "parallel", "duckdb", "polars")
+DEFAULT_ENGINE = "pandas"
+
+
+def find_data_files(folder_path):
+    """CSV shards, or Parquet shards when the folder holds those instead."""
+    csv_files = find_csv_files(folder_path)
+    if csv_files:
+        return csv_files
+    return sorted(glob.glob(
+        os.path.join(folder_path, "**", "*.parquet"),
+        recursive=True
+    ))
+
+
+def shard_layout(file, keys):
+    """Header names for the cleaned `keys` and for the count columns."""
+    if file.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        header = pq.read_schema(file).names
+    else:
+        header = pd.read_csv(file, encoding="latin1", nrows=0).columns.tolist()
+
+    by_clean = {clean_column(c): c for c in header}
+    missing = [k for k in keys if k not in by_clean]
+    if missing:
+        raise ValueError(f"{file} has no {missing} column(s)")
+    return [by_clean[k] for k in keys], count_columns(header)
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def duckdb_sums(files, keys):
+    import duckdb
+
+    key_cols, _ = shard_layout(files[0], keys)
+
+    # In-memory database: aggregation state spills to a temp directory
+    # once it outgrows DuckDB's memory limit
+    con = duckdb.connect()
+
+    if files[0].endswith(".parquet"):
+        source = "read_parquet($files, union_by_name = true)"
+    else:
+        # all_varchar skips type sniffing; counts are cast below
+        source = (
+            "read_csv($files, header = true, all_varchar = true, "
+            "union_by_name = true, encoding = 'latin-1')"
+        )
+
+    # Count columns of the union of all shard headers, not of the first
+    # shard only: a column that only later shards have is still summed
+    union = con.execute(f"DESCRIBE SELECT * FROM {source}", {"files": files})
+    count_cols = count_columns([row[0] for row in union.fetchall()])
+
+    selects = []
+    for key, col in zip(keys, key_cols):
+        expr = f"TRY_CAST({_quote(col)} AS BIGINT)" if key == "pincode" else \
+            f"CAST({_quote(col)} AS VARCHAR)"
+        selects.append(f"{expr} AS {_quote(key)}")
+    for col in count_cols:
+        selects.append(
+            f"SUM(COALESCE(TRY_CAST({_quote(col)} AS BIGINT), 0)) "
+            f"AS {_quote(clean_column(col))}"
+        )
+    group_by = ", ".join(_quote(k) for k in keys)
+
+    # The state-level query drops missing states, as groupby does
+    where = f"WHERE {_quote(key_cols[0])} IS NOT NULL" if keys == ["state"] else ""
+
+    sql = f"""
+        SELECT {", ".join(selects)}
+        FROM {source}
+        {where}
+        GROUP BY {group_by}
+    """
+    result = con.execute(sql, {"files": files}).df()
+    con.close()
+    return result
+
+
+def polars_sums(files, keys):
+    import polars as pl
+
+    frames = []
+    for file in files:
+        key_cols, count_cols = shard_layout(file, keys)
+        if file.endswith(".parquet"):
+            lazy = pl.scan_parquet(file)
+        else:
+            lazy = pl.scan_csv(file, infer_schema=False)
+
+        columns = [
+            pl.col(col).cast(pl.Int64, strict=False).alias(key)
+            if key == "pincode" else pl.col(col).cast(pl.String).alias(key)
+            for key, col in zip(keys, key_cols)
+        ]
+        columns += [
+            pl.col(col).cast(pl.Int64, strict=False).fill_null(0)
+            .alias(clean_column(col))
+            for col in count_cols
+        ]
+        frames.append(lazy.select(columns))
+
+    # Shards missing a count column get it as nulls, summed as 0
+    query = pl.concat(frames, how="diagonal")
+    if keys == ["state"]:
+        query = query.filter(pl.col("state").is_not_null())
+
+    try:
+        result = (
+            query.group_by(keys)
+            .agg(pl.exclude(keys).sum())
+            .collect(engine="streaming")
+            .to_pandas()
+        )
+    except pl.exceptions.ComputeError as e:
+        if "utf-8" not in str(e).lower():
+            raise
+        raise ValueError(
+            f"Non-UTF-8 bytes in the CSV shards ({e}); polars cannot read "
+            "them as latin-1 like the pandas loaders, use --engine duckdb"
+        ) from None
+
+    if not files[0].endswith(".parquet"):
+        # The pandas loaders and DuckDB decode CSV text as latin-1; give
+        # the (UTF-8 decoded) key values the same spelling
+        for key in keys:
+            if key != "pincode":
+                names = result[key].dropna().unique()
+                result[key] = result[key].map(
+                    {n: n.encode("utf-8").decode("latin-1") for n in names}
+                )
+    return result
+
+
+@instrument.stage("load")
+def engine_sums(folder_path, keys, value_name, engine="duckdb"):
+    """
+    Per-key cohort sums and total of a folder's count columns, computed
+    by an out-of-core engine; the same frame as grouping the
+    pandas-loaded folder by `keys` (raw key values, int64 sums, indexed
+    by `keys`).
+    """
+    files = find_data_files(folder_path)
+
+    print(f"\n{engine} scan: {folder_path}")
+    print("Files found:", len(files))
+
+    if not files:
+        raise ValueError(f"No CSV or Parquet files found in {folder_path}")
+
+    if engine == "parallel":
+        return parallel_sums([folder_path], keys, [value_name])[0]
+    if engine == "duckdb":
+        result = duckdb_sums(files, keys)
+    elif engine == "polars":
+        result = polars_sums(files, keys)
+    else:
+        raise ValueError(f"Unknown engine: {engine!r}")
+
+    sums = dataset_counts(result.set_index(keys), value_name).astype("int64")
+    return sums.sort_index()
+
+
+@instrument.stage("load")
+def dataset_sums(folders, keys, value_names, engine="duckdb"):
+    """engine_sums per dataset; the parallel engine shares one pool."""
+    if engine == "parallel":
+        return parallel_sums(folders, keys, value_names)
+    return [
+        engine_sums(folder, keys, name, engine)
+        for folder, name in zip(folders, value_names)
+    ]
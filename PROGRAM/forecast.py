@@ -0,0 +1,253 @@
+import argparse
+import os
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import instrument
+from schema import COUNT_NAMES
+from scoring import DEFAULT_CONFIG, score_configs
+from timeseries import aggregate_by_date
+
+
+# -------------------------------
+# BATCHED BASELINE FORECASTS
+# -------------------------------
+
+# Every model is fitted to all series at once: one (series x weeks)
+# array, one numpy step per week, never a Python loop over regions.
+#   ses            - simple exponential smoothing, alpha picked per series
+#                    from ALPHAS by one-step squared error
+#   seasonal_naive - repeat the last SEASON weeks
+#   auto           - per series, whichever of the two fits better
+METHODS = ("auto", "ses", "seasonal_naive")
+DEFAULT_METHOD = "auto"
+SEASON = 4              # weeks: a roughly monthly cycle
+ALPHAS = np.linspace(0.05, 0.95, 19)
+INTERVAL = 0.8          # central prediction interval
+DEFAULT_HORIZON = 8     # weeks
+
+# Forecast levels and their region keys (pincodes are too sparse per week)
+LEVELS = {
+    "state": ["state"],
+    "district": ["state", "district"]
+}
+
+
+def ses_fit(y, alphas=ALPHAS):
+    """
+    Simple exponential smoothing of every row of y (series x weeks).
+
+    All alphas of the grid run side by side as one (alphas x series)
+    array; each series keeps the alpha with the lowest one-step squared
+    error. Returns the final level, alpha and residual sigma per series.
+    """
+    n, weeks = y.shape
+    level = np.repeat(y[None, :, 0], len(alphas), axis=0)
+    sse = np.zeros_like(level)
+    rate = alphas[:, None]
+
+    for t in range(1, weeks):
+        err = y[:, t] - level
+        sse += err ** 2
+        level += rate * err
+
+    best = sse.argmin(axis=0)
+    series = np.arange(n)
+    sigma = np.sqrt(sse[best, series] / max(weeks - 1, 1))
+    return level[best, series], alphas[best], sigma
+
+
+def ses_forecast(y, horizon, z, alphas=ALPHAS):
+    level, alpha, sigma = ses_fit(y, alphas)
+    steps = np.arange(horizon)
+    mean = np.repeat(level[:, None], horizon, axis=1)
+    # h-step SES forecast variance: sigma^2 * (1 + (h - 1) * alpha^2)
+    spread = z * sigma[:, None] * np.sqrt(1 + steps * alpha[:, None] ** 2)
+    return mean, spread, sigma
+
+
+def seasonal_naive_forecast(y, horizon, z, season=SEASON):
+    weeks = y.shape[1]
+    if weeks <= season:
+        # Not one full season of history: plain naive (last week)
+        season = 1
+
+    steps = np.arange(horizon)
+    mean = y[:, weeks - season + steps % season]
+
+    resid = y[:, season:] - y[:, :-season]
+    sigma = (
+        np.sqrt((resid ** 2).mean(axis=1)) if resid.shape[1]
+        else np.zeros(len(y))
+    )
+    # Error grows with each season the forecast reaches past the data
+    spread = z * sigma[:, None] * np.sqrt(steps // season + 1)
+    return mean, spread, sigma
+
+
+def forecast_matrix(y, horizon, method=DEFAULT_METHOD, interval=INTERVAL):
+    """Point forecast and interval bounds (series x horizon) for y."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown forecast method: {method!r}")
+    z = NormalDist().inv_cdf(0.5 + interval / 2)
+
+    if method == "ses":
+        mean, spread, _ = ses_forecast(y, horizon, z)
+    elif method == "seasonal_naive":
+        mean, spread, _ = seasonal_naive_forecast(y, horizon, z)
+    else:
+        ses_mean, ses_spread, ses_sigma = ses_forecast(y, horizon, z)
+        sn_mean, sn_spread, sn_sigma = seasonal_naive_forecast(y, horizon, z)
+        pick = (sn_sigma < ses_sigma)[:, None]
+        mean = np.where(pick, sn_mean, ses_mean)
+        spread = np.where(pick, sn_spread, ses_spread)
+
+    # Counts: never below zero
+    mean = mean.clip(min=0)
+    return mean, (mean - spread).clip(min=0), mean + spread
+
+
+# -------------------------------
+# REGIONAL DEMAND FORECAST
+# -------------------------------
+
+def weekly_cube(sums):
+    """
+    (regions x count columns x weeks) array of (region, date) sums on a
+    complete weekly calendar; weeks without rows are zero.
+    """
+    dates = sums.index.get_level_values("date")
+    calendar = pd.period_range(dates.min(), dates.max(), freq="W").start_time
+    regions = sums.index.droplevel("date").unique()
+
+    cube = np.stack([
+        sums[column].unstack("date", fill_value=0)
+        .reindex(index=regions, columns=calendar, fill_value=0)
+        .to_numpy(dtype=float)
+        for column in sums.columns
+    ], axis=1)
+    return regions, calendar, cube
+
+
+@instrument.stage("forecast")
+def forecast_demand(sums, horizon=DEFAULT_HORIZON, method=DEFAULT_METHOD,
+                    interval=INTERVAL):
+    """
+    Next-`horizon`-week forecast for weekly (region, date) sums.
+
+    Every count column of every region is one row of a single array,
+    fitted in one batched pass. Returns (weeks, totals):
+      weeks  - per (region, week) forecast of the dataset totals with
+               `<name>_lower` / `<name>_upper` interval bounds
+      totals - per region, every count column summed over the horizon
+    """
+    regions, calendar, cube = weekly_cube(sums)
+    n_regions, n_columns, n_weeks = cube.shape
+
+    mean, lower, upper = forecast_matrix(
+        cube.reshape(-1, n_weeks), horizon, method, interval
+    )
+    mean, lower, upper = (
+        a.reshape(n_regions, n_columns, horizon) for a in (mean, lower, upper)
+    )
+
+    future = pd.period_range(
+        calendar[-1], periods=horizon + 1, freq="W"
+    )[1:].start_time
+
+    keys = regions.to_frame(index=False).loc[
+        np.repeat(np.arange(n_regions), horizon)
+    ].reset_index(drop=True)
+    keys["date"] = np.tile(future, n_regions)
+
+    columns = {}
+    for name in COUNT_NAMES:
+        c = sums.columns.get_loc(name)
+        columns[name] = mean[:, c].ravel()
+        columns[f"{name}_lower"] = lower[:, c].ravel()
+        columns[f"{name}_upper"] = upper[:, c].ravel()
+    weeks = pd.DataFrame(columns, index=pd.MultiIndex.from_frame(keys)).round(1)
+
+    totals = pd.DataFrame(mean.sum(axis=2), index=regions, columns=sums.columns)
+
+    print(f"\nForecast ({method}, {horizon} weeks, {interval:.0%} interval): "
+          f"{n_regions * n_columns} series x {n_weeks} weeks")
+    return weeks, totals
+
+
+def forecast_scores(totals, assi_config=DEFAULT_CONFIG):
+    """
+    Update pressure and ASSI of the horizon's forecast demand, per
+    region. Regions with no forecast enrolments are left out.
+
+    The pressure is absolute and is what forecast_risk classifies; the
+    ASSI is normalised across the forecast regions, a ranking only.
+    """
+    table = totals[totals["enrolment_count"] > 0].copy()
+    table["total_updates"] = table["demographic_updates"] + table["biometric_updates"]
+
+    # Same scoring as STEP 10, across the forecast regions
+    assi, _, _ = score_configs(table, [assi_config])
+
+    return pd.DataFrame({
+        "forecast_update_pressure": table["total_updates"] / table["enrolment_count"],
+        "forecast_assi": assi.iloc[:, 0]
+    }, index=table.index)
+
+
+def forecast_level(enrol, demo, bio, level="state", horizon=DEFAULT_HORIZON,
+                   method=DEFAULT_METHOD, interval=INTERVAL,
+                   assi_config=DEFAULT_CONFIG):
+    """Weekly forecast and forecast scores for one level of regions."""
+    sums = aggregate_by_date(enrol, demo, bio, "W", LEVELS[level])
+    weeks, totals = forecast_demand(sums, horizon, method, interval)
+    return weeks, forecast_scores(totals, assi_config)
+
+
+def export_forecast(weeks, output_path, level):
+    stem, ext = os.path.splitext(output_path)
+    path = f"{stem}_forecast_{level}{ext or '.csv'}"
+    weeks.to_csv(path)
+    print("Exported forecast:", path)
+
+
+def main(argv=None):
+    from adhar import BIO_DIR, CACHE_DIR, DEMO_DIR, ENROL_DIR, RAW_LOADERS, load_raw
+
+    parser = argparse.ArgumentParser(
+        description="Forecast next-N-week enrolment and update demand per region"
+    )
+    parser.add_argument("--data", default=".",
+                        help="folder holding the three api_data_aadhar_* folders")
+    parser.add_argument("--level", default="state", choices=list(LEVELS))
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON,
+                        help="weeks to forecast")
+    parser.add_argument("--method", default=DEFAULT_METHOD, choices=METHODS)
+    parser.add_argument("--interval", type=float, default=INTERVAL,
+                        help="central prediction interval, e.g. 0.8 or 0.95")
+    parser.add_argument("--loader", default="cached", choices=RAW_LOADERS)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--output", default="demand_forecast.csv")
+    args = parser.parse_args(argv)
+
+    folders = [os.path.join(args.data, d) for d in (ENROL_DIR, DEMO_DIR, BIO_DIR)]
+    enrol, demo, bio = load_raw(folders, args.loader, args.cache_dir)
+
+    sums = aggregate_by_date(enrol, demo, bio, "W", LEVELS[args.level])
+    start = time.perf_counter()
+    weeks, totals = forecast_demand(sums, args.horizon, args.method, args.interval)
+    scores = forecast_scores(totals)
+    print(f"Fitted {len(totals)} regions in {time.perf_counter() - start:.3f} s")
+
+    weeks.to_csv(args.output)
+    stem, ext = os.path.splitext(args.output)
+    scores.to_csv(f"{stem}_scores{ext or '.csv'}")
+    print(scores.sort_values("forecast_assi", ascending=False).head(10))
+    print("Written:", args.output)
+
+
+if __name__ == "__main__":
+    main()
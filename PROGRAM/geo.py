@@ -0,0 +1,204 @@
+import argparse
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from states import STATES, UNMATCHED_ID, canonical_states, state_ids, successor_ids
+
+
+# -------------------------------
+# INDIA MAP LAYER
+# -------------------------------
+
+GEOJSON_PATH = "INDIA_STATES.geojson"
+
+# Simplified geometry store: one GeoParquet (WKB) file per level of
+# detail, tolerance in degrees. India spans ~30° east-west, so at
+# 800 px one pixel is ~0.04° and finer vertices are never visible.
+GEOMETRY_STORE = "geometry_store"
+LOD_TOLERANCES = {
+    "full": 0.0,
+    "high": 0.005,
+    "medium": 0.02,
+    "low": 0.05
+}
+MAP_SPAN_DEGREES = 30.0
+
+# Choropleth metrics: column → (title, legend label)
+MAP_METRICS = {
+    "assi": (
+        "India: Aadhaar Service Stress Index (ASSI)",
+        "ASSI (0–100)"
+    ),
+    "update_pressure": (
+        "India: Aadhaar Update Pressure",
+        "Update Pressure"
+    ),
+    "ies_score": (
+        "India: Intervention Efficiency Score (IES)",
+        "IES (0–100)"
+    ),
+    "friction_score": (
+        "India: Aadhaar Update Friction Score",
+        "Friction Score (0–100)"
+    )
+}
+
+
+def read_state_geojson(path=GEOJSON_PATH):
+    """Full-resolution state polygons with `state_id` / `state` join keys."""
+    import geopandas as gpd
+
+    india = gpd.read_file(path)
+
+    # Automatically detect state-name column
+    state_col = [c for c in india.columns if c.lower() != "geometry"][0]
+
+    # LGD codes when the file has them, otherwise the alias index
+    lgd_col = next((c for c in india.columns if c.lower() == "state_lgd"), None)
+    if lgd_col is not None:
+        ids = pd.to_numeric(india[lgd_col], errors="coerce").fillna(UNMATCHED_ID)
+    else:
+        ids = state_ids(india[state_col])
+
+    # Polygons of retired units (Daman & Diu, DNH) join the merged unit
+    india["state_id"] = successor_ids(ids)
+    india["state"] = [
+        STATES.get(state_id, name)
+        for state_id, name in zip(
+            india["state_id"],
+            canonical_states(india[state_col], report=False).astype(object)
+        )
+    ]
+    return india
+
+
+def simplify_states(geometry, tolerance):
+    # Coverage simplification keeps shared borders shared (no slivers or
+    # gaps between neighbouring states); older geopandas falls back to
+    # per-polygon topology-preserving simplification
+    if tolerance <= 0:
+        return geometry
+    if hasattr(geometry, "simplify_coverage"):
+        return geometry.simplify_coverage(tolerance)
+    return geometry.simplify(tolerance, preserve_topology=True)
+
+
+def lod_path(level, store_dir=GEOMETRY_STORE):
+    return os.path.join(store_dir, f"india_states_{level}.parquet")
+
+
+def build_geometry_store(geojson_path=GEOJSON_PATH, store_dir=GEOMETRY_STORE,
+                         tolerances=LOD_TOLERANCES):
+    """Preprocess the GeoJSON into one simplified GeoParquet per level."""
+    india = read_state_geojson(geojson_path)
+    os.makedirs(store_dir, exist_ok=True)
+
+    for level, tolerance in tolerances.items():
+        lod = india.copy()
+        lod["geometry"] = simplify_states(india.geometry, tolerance)
+        path = lod_path(level, store_dir)
+        lod.to_parquet(path)
+
+        vertices = lod.geometry.count_coordinates().sum()
+        print(f"{level:>6}: tolerance={tolerance}, vertices={vertices}, "
+              f"{os.path.getsize(path) / 1024:.0f} KB → {path}")
+
+
+def pick_level(width_px, tolerances=LOD_TOLERANCES):
+    """Coarsest level whose tolerance is still below one output pixel."""
+    degrees_per_px = MAP_SPAN_DEGREES / width_px
+    fitting = [
+        (tolerance, level) for level, tolerance in tolerances.items()
+        if tolerance <= degrees_per_px
+    ]
+    return max(fitting)[1]
+
+
+def load_state_geometries(path=GEOJSON_PATH, width_px=None,
+                          store_dir=GEOMETRY_STORE):
+    """
+    State polygons for a map `width_px` pixels wide.
+
+    Reads the matching level from the geometry store when it has been
+    built (python geo.py), otherwise parses the GeoJSON.
+    """
+    if width_px is not None:
+        path_lod = lod_path(pick_level(width_px), store_dir)
+        if os.path.exists(path_lod):
+            import geopandas as gpd
+            return gpd.read_parquet(path_lod)
+    return read_state_geojson(path)
+
+
+def unmatched_map_states(india, table):
+    """Data states with no polygon and polygons with no data, by name."""
+    has_polygon = np.isin(table["state_id"], india["state_id"])
+    has_data = np.isin(india["state_id"], table["state_id"])
+    return (
+        sorted(set(table.loc[~has_polygon, "state"].astype(str))),
+        sorted(set(india.loc[~has_data, "state"].astype(str)))
+    )
+
+
+def merge_map_data(india, table, report=True):
+    """
+    Left-join the scored table onto the polygons on the integer
+    `state_id`; inputs are not modified. States that cannot be drawn are
+    listed when `report` is set instead of vanishing from the map.
+    """
+    if report:
+        no_polygon, no_data = unmatched_map_states(india, table)
+        if no_polygon:
+            print("States with data but no map polygon:", no_polygon)
+        if no_data:
+            print("Map polygons with no data:", no_data)
+
+    return india.merge(
+        table.drop(columns="state"),
+        on="state_id",
+        how="left"
+    )
+
+
+def render_choropleth(merged, metric="assi", fmt="png", figsize=(8, 10), dpi=100):
+    """Rasterise one choropleth to PNG/SVG bytes."""
+    # A bare Figure, not pyplot: no global state, safe in server threads
+    from matplotlib.figure import Figure
+
+    title, label = MAP_METRICS[metric]
+
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    merged.plot(
+        column=metric,
+        cmap="Reds",
+        linewidth=0.6,
+        ax=ax,
+        edgecolor="black",
+        legend=True,
+        legend_kwds={"label": label}
+    )
+    ax.set_title(title, fontsize=14)
+    ax.axis("off")
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build the simplified India state geometry store"
+    )
+    parser.add_argument("--geojson", default=GEOJSON_PATH)
+    parser.add_argument("--store-dir", default=GEOMETRY_STORE)
+    args = parser.parse_args(argv)
+
+    build_geometry_store(args.geojson, args.store_dir)
+
+
+if __name__ == "__main__":
+    main()
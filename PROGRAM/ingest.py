@@ -0,0 +1,446 @@
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import instrument
+from schema import clean_column, count_columns, dataset_counts
+
+
+# -------------------------------
+# SHARD DISCOVERY
+# -------------------------------
+
+def find_csv_files(folder_path):
+    """All CSV shards under folder_path (recursive), in a stable order."""
+    return sorted(glob.glob(
+        os.path.join(folder_path, "**", "*.csv"),
+        recursive=True
+    ))
+
+
+# -------------------------------
+# COLUMN-PRUNED PARALLEL LOADER
+# -------------------------------
+
+def _read_shard_pruned(file):
+    # Peek at the header only, then parse just `state` + the count columns
+    header = pd.read_csv(file, encoding="latin1", nrows=0).columns
+    state_col = next(c for c in header if clean_column(c) == "state")
+    count_cols = count_columns(header)
+
+    df = pd.read_csv(
+        file,
+        encoding="latin1",
+        usecols=[state_col] + count_cols,
+        dtype={state_col: "category"}
+    )
+
+    states = df[state_col]
+    counts = {
+        clean_column(col): (
+            pd.to_numeric(df[col], errors="coerce")
+            .fillna(0)
+            .to_numpy(dtype=np.int32)
+        )
+        for col in count_cols
+    }
+
+    return (
+        states.cat.categories.to_numpy(dtype=object),
+        states.cat.codes.to_numpy(),
+        counts
+    )
+
+
+def load_csvs_parallel(folder_path, max_workers=None, use_processes=False):
+    """
+    Fast alternative to load_csvs_from_folder.
+
+    Reads shards concurrently, keeps only `state` and the count columns
+    (schema.py), and returns a frame with a categorical `state` and int32
+    counts. Shards are written straight into preallocated arrays, so no
+    list of per-file DataFrames is concatenated.
+    """
+    csv_files = find_csv_files(folder_path)
+
+    print(f"\nSearching in folder: {folder_path}")
+    print("CSV files found:", len(csv_files))
+
+    if not csv_files:
+        raise ValueError(f"No CSV files found in {folder_path}")
+
+    # Threads by default: read_csv releases the GIL while parsing and the
+    # script stays safe to run without a __main__ guard on Windows
+    pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool_cls(max_workers=max_workers) as pool:
+        shards = list(pool.map(_read_shard_pruned, csv_files))
+
+    count_names = list(dict.fromkeys(name for s in shards for name in s[2]))
+    categories = pd.Index(
+        np.unique(np.concatenate([s[0] for s in shards]).astype(str))
+    )
+
+    total_rows = sum(len(s[1]) for s in shards)
+    codes = np.empty(total_rows, dtype=np.int32)
+    # Zeros: a shard lacking one of the count columns contributes nothing
+    counts = {name: np.zeros(total_rows, dtype=np.int32) for name in count_names}
+
+    pos = 0
+    for i, (shard_cats, shard_codes, shard_counts) in enumerate(shards):
+        end = pos + len(shard_codes)
+        # Map shard-local category codes onto the global categories;
+        # the appended -1 keeps missing states (code -1) missing
+        remap = np.append(categories.get_indexer(shard_cats), -1)
+        codes[pos:end] = remap[shard_codes]
+        for name, values in shard_counts.items():
+            counts[name][pos:end] = values
+        shards[i] = None
+        pos = end
+
+    return pd.DataFrame({
+        "state": pd.Categorical.from_codes(codes, categories),
+        **counts
+    })
+
+
+# -------------------------------
+# STREAMING STATE AGGREGATION
+# -------------------------------
+
+def _fold(acc, partial):
+    # Running per-state sum; stays the size of the state list
+    if acc is None:
+        return partial
+    return pd.concat([acc, partial]).groupby(level=0).sum()
+
+
+def aggregate_file_by_state(file, chunksize=500_000):
+    """Per-state sums of one shard's count columns, read chunk by chunk."""
+    header = pd.read_csv(file, encoding="latin1", nrows=0).columns
+    state_col = next(c for c in header if clean_column(c) == "state")
+    count_cols = count_columns(header)
+
+    chunks = pd.read_csv(
+        file,
+        encoding="latin1",
+        usecols=[state_col] + count_cols,
+        chunksize=chunksize
+    )
+
+    acc = None
+    for chunk in chunks:
+        acc = _fold(acc, chunk.groupby(state_col)[count_cols].sum())
+        del chunk
+    acc.columns = [clean_column(c) for c in acc.columns]
+    return acc
+
+
+@instrument.stage("load")
+def aggregate_state_streaming(folder_path, value_name, chunksize=500_000):
+    """
+    Per-state cohort sums and total of the count columns, read chunk by
+    chunk.
+
+    Equivalent to loading the folder and summing its count columns by
+    state, but only one chunk is ever in memory, so peak usage depends
+    on the number of states rather than the number of rows.
+    """
+    csv_files = find_csv_files(folder_path)
+
+    print(f"\nStreaming folder: {folder_path}")
+    print("CSV files found:", len(csv_files))
+
+    if not csv_files:
+        raise ValueError(f"No CSV files found in {folder_path}")
+
+    acc = None
+    for file in csv_files:
+        print("Reading:", file)
+        acc = _fold(acc, aggregate_file_by_state(file, chunksize))
+
+    acc.index.name = "state"
+    return dataset_counts(acc, value_name)
+
+
+# -------------------------------
+# MULTI-CORE MAP-REDUCE AGGREGATION
+# -------------------------------
+
+def shard_key_sums(task):
+    """Map step: one shard's per-key sums of its count columns."""
+    file, keys = task
+    header = pd.read_csv(file, encoding="latin1", nrows=0).columns
+    by_clean = {clean_column(c): c for c in header}
+    key_cols = [by_clean[k] for k in keys]
+    count_cols = count_columns(header)
+
+    df = pd.read_csv(file, encoding="latin1", usecols=key_cols + count_cols)
+    df.columns = [clean_column(c) for c in df.columns]
+
+    # The state-level sums drop missing states, as groupby does; the
+    # hierarchy keeps them (dropna=False) for the cleanup that follows
+    return (
+        df.groupby(keys, dropna=keys != ["state"])[
+            [clean_column(c) for c in count_cols]
+        ]
+        .sum()
+    )
+
+
+def merge_partials(partials):
+    """Reduce step: pairwise (tree) merge, log2(shards) rounds deep."""
+    while len(partials) > 1:
+        partials = [
+            pd.concat(partials[i:i + 2])
+            .groupby(level=list(range(partials[i].index.nlevels)), dropna=False)
+            .sum()
+            for i in range(0, len(partials), 2)
+        ]
+    return partials[0]
+
+
+def parallel_sums(folders, keys, value_names, max_workers=None):
+    """
+    Per-key sums for several datasets in one process pool.
+
+    The shards of all datasets are partitioned across the workers; each
+    worker returns only its small per-key partial table, and the partials
+    of each dataset are tree-merged in the parent. Returns one frame of
+    cohort sums and total per folder, equal to grouping the fully loaded
+    folder by `keys`.
+    """
+    files = [find_csv_files(folder) for folder in folders]
+    for folder, found in zip(folders, files):
+        print(f"\nParallel scan: {folder}")
+        print("CSV files found:", len(found))
+        if not found:
+            raise ValueError(f"No CSV files found in {folder}")
+
+    tasks = [(file, list(keys)) for found in files for file in found]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        partials = list(pool.map(shard_key_sums, tasks))
+
+    results = []
+    pos = 0
+    for found, name in zip(files, value_names):
+        sums = merge_partials(partials[pos:pos + len(found)])
+        pos += len(found)
+        results.append(dataset_counts(sums, name).sort_index())
+    return results
+
+
+# -------------------------------
+# PERSISTENT SHARD CACHE (FEATHER)
+# -------------------------------
+
+MANIFEST_NAME = "manifest.json"
+
+
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def read_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(cache_dir, manifest):
+    # Write-then-rename so a crashed run never leaves a torn manifest
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _parse_clean_shard(file):
+    df = pd.read_csv(file, encoding="latin1")
+    df.columns = df.columns.str.strip().str.lower()
+
+    # Arrow needs one type per column; keep text columns as nullable strings
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].astype("string")
+    return df
+
+
+def _cache_shard(file, cache_path):
+    from pyarrow import feather
+
+    df = _parse_clean_shard(file)
+    # Uncompressed so the cache can be memory-mapped on the next read
+    feather.write_feather(df, cache_path, compression="uncompressed")
+    return df
+
+
+def load_csvs_cached(folder_path, cache_dir=".ingest_cache", max_workers=None):
+    """
+    load_csvs_from_folder backed by an on-disk Feather cache.
+
+    Each shard is cached as its cleaned table (lowercased column names),
+    keyed by absolute path, size and mtime. Unchanged shards are read back
+    memory-mapped; new or modified shards are re-parsed in parallel and
+    re-cached. Entries whose source file has disappeared are evicted.
+    """
+    from pyarrow import feather
+
+    csv_files = find_csv_files(folder_path)
+
+    print(f"\nSearching in folder: {folder_path}")
+    print("CSV files found:", len(csv_files))
+
+    if not csv_files:
+        raise ValueError(f"No CSV files found in {folder_path}")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = read_manifest(cache_dir)
+
+    # Evict entries for sources that no longer exist
+    evicted = 0
+    for source in list(manifest):
+        if not os.path.exists(source):
+            stale = os.path.join(cache_dir, manifest.pop(source)["cache"])
+            if os.path.exists(stale):
+                os.remove(stale)
+            print("Evicted:", source)
+            evicted += 1
+
+    hits, misses = {}, {}
+    for file in csv_files:
+        source = os.path.abspath(file)
+        name = hashlib.sha1(source.encode("utf-8")).hexdigest() + ".feather"
+        entry = manifest.get(source)
+        fingerprint = file_fingerprint(file)
+        cache_path = os.path.join(cache_dir, name)
+
+        if (
+            entry is not None
+            and entry["size"] == fingerprint["size"]
+            and entry["mtime_ns"] == fingerprint["mtime_ns"]
+            and os.path.exists(cache_path)
+        ):
+            hits[file] = cache_path
+        else:
+            misses[file] = cache_path
+            manifest[source] = {"cache": name, **fingerprint}
+
+    print(f"Cache hits: {len(hits)}, re-parsed: {len(misses)}")
+
+    frames = {}
+    for file, cache_path in hits.items():
+        frames[file] = feather.read_table(
+            cache_path, memory_map=True
+        ).to_pandas()
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            parsed = pool.map(_cache_shard, misses, misses.values())
+            for file, df in zip(misses, parsed):
+                print("Reading:", file)
+                frames[file] = df
+
+    if misses or evicted:
+        write_manifest(cache_dir, manifest)
+
+    # Keep the same row order as a plain folder scan
+    return pd.concat([frames[f] for f in csv_files], ignore_index=True)
+
+
+# -------------------------------
+# INCREMENTAL STATE SUMS
+# -------------------------------
+
+def _to_json_number(value):
+    return value.item() if hasattr(value, "item") else value
+
+
+@instrument.stage("load")
+def incremental_state_sums(folder_path, value_name, state_dir=".lifecycle_state"):
+    """
+    Per-state sums that only read shards not absorbed by a previous run.
+
+    `state_dir/<value_name>.json` keeps, for every absorbed file, its
+    fingerprint and its own per-state partial sums of each count column.
+    New shards are aggregated and added; modified or deleted shards have
+    their old partial retracted. The result matches
+    aggregate_state_streaming over the same folder.
+    """
+    csv_files = find_csv_files(folder_path)
+
+    print(f"\nIncremental folder: {folder_path}")
+    print("CSV files found:", len(csv_files))
+
+    if not csv_files:
+        raise ValueError(f"No CSV files found in {folder_path}")
+
+    os.makedirs(state_dir, exist_ok=True)
+    store_path = os.path.join(state_dir, f"{value_name}.json")
+    absorbed = {}
+    if os.path.exists(store_path):
+        with open(store_path, encoding="utf-8") as f:
+            absorbed = json.load(f)
+
+    current = {os.path.abspath(f): f for f in csv_files}
+    changed = False
+
+    # Retract shards that were removed since the last run
+    for source in list(absorbed):
+        if source not in current:
+            del absorbed[source]
+            print("Retracted:", source)
+            changed = True
+
+    # Absorb new or modified shards; each file is only read once
+    new_files = 0
+    for source, file in current.items():
+        fingerprint = file_fingerprint(file)
+        entry = absorbed.get(source)
+        # Entries without per-column "counts" predate the cohort schema
+        # (one summed column) and are re-read
+        if (
+            entry is not None
+            and entry["fingerprint"] == fingerprint
+            and "counts" in entry
+        ):
+            continue
+
+        print("Absorbing:", file)
+        partial = aggregate_file_by_state(file)
+        absorbed[source] = {
+            "fingerprint": fingerprint,
+            "counts": {
+                column: {
+                    str(state): _to_json_number(value)
+                    for state, value in partial[column].items()
+                }
+                for column in partial
+            }
+        }
+        new_files += 1
+        changed = True
+
+    print(f"New/changed shards: {new_files}, already absorbed: "
+          f"{len(current) - new_files}")
+
+    if changed:
+        tmp = store_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(absorbed, f, sort_keys=True)
+        os.replace(tmp, store_path)
+
+    # Fold the stored partials; this is files x states, not rows
+    acc = None
+    for source in sorted(absorbed):
+        acc = _fold(acc, pd.DataFrame(absorbed[source]["counts"]))
+
+    acc.index.name = "state"
+    return dataset_counts(acc, value_name)
@@ -0,0 +1,233 @@
+import functools
+import json
+import sys
+import time
+
+import pandas as pd
+
+
+# -------------------------------
+# STAGE INSTRUMENTATION
+# -------------------------------
+
+# Off by default: a disabled stage costs one dict lookup per call.
+# enable() starts recording; report()/write_report() summarise per stage.
+_STATE = {"enabled": False, "active": 0, "records": [], "process_peak": 0}
+
+METRIC_PREFIX = "aadhaar_pipeline"
+
+
+def enable():
+    _STATE["enabled"] = True
+    _STATE["records"] = []
+
+
+def disable():
+    _STATE["enabled"] = False
+
+
+def peak_rss_bytes():
+    """Process high-water RSS so far (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:     # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    peak = peak if sys.platform == "darwin" else peak * 1024
+    # reset_peak_rss() lowers the kernel's mark; earlier peaks are kept here
+    return max(peak, _STATE["process_peak"], high_water_bytes() or 0)
+
+
+def high_water_bytes():
+    # RSS high-water mark since the last reset_peak_rss() (Linux only)
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """
+    Restart the kernel's RSS high-water mark, so the next reading covers
+    only what runs after this call (Linux). Returns False where that is
+    not supported; stage peaks are then not recorded.
+    """
+    peak = high_water_bytes()
+    if peak is None:
+        return False
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        return False
+    _STATE["process_peak"] = max(_STATE["process_peak"], peak)
+    return True
+
+
+def peak_rss_mb():
+    peak = peak_rss_bytes()
+    return None if peak is None else round(peak / 1024 ** 2, 1)
+
+
+def bytes_read():
+    # Bytes passed through read() calls, page cache included (Linux only)
+    try:
+        with open("/proc/self/io", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def count_rows(value):
+    """Rows in a frame/Series, or summed over the frames in a tuple/list."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        counts = [c for c in map(count_rows, value) if c is not None]
+        if counts:
+            return sum(counts)
+    return None
+
+
+def stage(name):
+    """
+    Decorator recording one pipeline stage: duration, input/output rows,
+    the stage's own peak RSS, the process peak so far and bytes read.
+    Calls nested inside an already recorded stage are folded into it
+    rather than counted twice.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _STATE["enabled"] or _STATE["active"]:
+                return func(*args, **kwargs)
+
+            per_stage = reset_peak_rss()
+            read_before = bytes_read()
+            start = time.perf_counter()
+            _STATE["active"] += 1
+            try:
+                out = func(*args, **kwargs)
+            finally:
+                _STATE["active"] -= 1
+            duration = time.perf_counter() - start
+            read_after = bytes_read()
+
+            _STATE["records"].append({
+                "stage": name,
+                "function": func.__name__,
+                "duration_s": duration,
+                "rows_in": count_rows(args),
+                "rows_out": count_rows(out),
+                "peak_rss_bytes": high_water_bytes() if per_stage else None,
+                "process_peak_rss_bytes": peak_rss_bytes(),
+                "bytes_read": (
+                    read_after - read_before
+                    if read_before is not None and read_after is not None
+                    else None
+                )
+            })
+            return out
+        return wrapper
+    return decorator
+
+
+def records():
+    return list(_STATE["records"])
+
+
+def _stage_rows(calls, key):
+    # Summed over repeated calls of one function (e.g. one load per
+    # dataset), max across the functions of a stage (chained steps such
+    # as the four classification passes see the same rows)
+    per_function = {}
+    for record in calls:
+        if record[key] is not None:
+            per_function[record["function"]] = (
+                per_function.get(record["function"], 0) + record[key]
+            )
+    return max(per_function.values()) if per_function else None
+
+
+def report():
+    """Per-stage totals in pipeline order (JSON-serialisable)."""
+    by_stage = {}
+    for record in _STATE["records"]:
+        by_stage.setdefault(record["stage"], []).append(record)
+
+    stages = {}
+    for name, calls in by_stage.items():
+        peaks = [r["peak_rss_bytes"] for r in calls if r["peak_rss_bytes"] is not None]
+        process_peaks = [
+            r["process_peak_rss_bytes"] for r in calls
+            if r["process_peak_rss_bytes"] is not None
+        ]
+        reads = [r["bytes_read"] for r in calls if r["bytes_read"] is not None]
+        stages[name] = {
+            "calls": len(calls),
+            "duration_s": sum(r["duration_s"] for r in calls),
+            "rows_in": _stage_rows(calls, "rows_in"),
+            "rows_out": _stage_rows(calls, "rows_out"),
+            # Highest RSS while the stage ran, vs. the cumulative process
+            # peak (earlier stages included) when it finished
+            "peak_rss_bytes": max(peaks) if peaks else None,
+            "process_peak_rss_bytes": max(process_peaks) if process_peaks else None,
+            "bytes_read": sum(reads) if reads else None
+        }
+
+    return {
+        "total_duration_s": sum(s["duration_s"] for s in stages.values()),
+        "process_peak_rss_bytes": peak_rss_bytes(),
+        "stages": stages,
+        "calls": records()
+    }
+
+
+def prometheus_text(summary=None):
+    """The per-stage report in Prometheus text exposition format."""
+    summary = summary or report()
+    metrics = {
+        "stage_duration_seconds": ("duration_s", "Wall time per pipeline stage"),
+        "stage_calls": ("calls", "Instrumented calls per stage"),
+        "stage_rows_in": ("rows_in", "Input rows of the stage"),
+        "stage_rows_out": ("rows_out", "Output rows of the stage"),
+        "stage_peak_rss_bytes": ("peak_rss_bytes", "Peak RSS while the stage ran"),
+        "stage_process_peak_rss_bytes": (
+            "process_peak_rss_bytes",
+            "Cumulative process peak RSS when the stage finished"
+        ),
+        "stage_read_bytes": ("bytes_read", "Bytes read during the stage")
+    }
+
+    lines = []
+    for metric, (key, help_text) in metrics.items():
+        full = f"{METRIC_PREFIX}_{metric}"
+        lines.append(f"# HELP {full} {help_text}")
+        lines.append(f"# TYPE {full} gauge")
+        for name, entry in summary["stages"].items():
+            if entry[key] is not None:
+                lines.append(f'{full}{{stage="{name}"}} {entry[key]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_report(path):
+    """JSON report, or Prometheus text for *.prom / *.txt paths."""
+    summary = report()
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith((".prom", ".txt")):
+            f.write(prometheus_text(summary))
+        else:
+            json.dump(summary, f, indent=1)
+
+    print("\nStage timings:")
+    for name, entry in summary["stages"].items():
+        print(f"  {name:>15}: {entry['duration_s']:8.3f} s")
+    print("Pipeline metrics written:", path)
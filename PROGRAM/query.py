@@ -0,0 +1,98 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------
+# REGION QUERY INDEX
+# -------------------------------
+
+# Region ID columns, coarsest first; a region's ID is its state name, or a
+# (state, district[, pincode]) tuple for hierarchy exports
+REGION_KEYS = ("state", "district", "pincode")
+
+
+def region_keys(table):
+    return [c for c in REGION_KEYS if c in table.columns]
+
+
+def region_positions(table):
+    """Hash index: region ID → row position (first row if repeated)."""
+    keys = region_keys(table)
+    if len(keys) == 1:
+        ids = table[keys[0]].tolist()
+    else:
+        ids = list(zip(*(table[k].tolist() for k in keys)))
+    return {region: i for i, region in reversed(list(enumerate(ids)))}
+
+
+def metric_order(values):
+    # Row positions, highest first; ties keep table order, NaN sorts last
+    values = np.asarray(values, dtype=float)
+    return np.argsort(-values, kind="stable")
+
+
+def build_index(table, metrics=None):
+    """
+    Lookup structures for one scored table: a hash index on region ID
+    and one descending sort order per numeric metric. Built once in
+    O(n log n); lookups are then O(1) and top-k queries O(k).
+    """
+    if metrics is None:
+        metrics = table.select_dtypes("number").columns
+    return {
+        "keys": region_keys(table),
+        "positions": region_positions(table),
+        "order": {
+            metric: metric_order(table[metric].to_numpy(dtype=float, na_value=np.nan))
+            for metric in metrics
+        }
+    }
+
+
+def lookup(index, table, region):
+    """One-row frame for a region ID, or None if it is not in the table."""
+    pos = index["positions"].get(region)
+    if pos is None:
+        return None
+    return table.iloc[[pos]]
+
+
+def top_positions(index, metric, k=10):
+    return index["order"][metric][:k].tolist()
+
+
+def top_k(index, table, metric, k=10):
+    """The k regions with the highest `metric`, highest first."""
+    return table.iloc[index["order"][metric][:k]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Look up regions and top-k rankings in a lifecycle export"
+    )
+    parser.add_argument("--lifecycle", default="aadhaar_bottleneck_prediction.csv",
+                        help="state, district or pincode table from adhar.py")
+    parser.add_argument("--region", nargs="+", default=None,
+                        help="region ID: state [district [pincode]]")
+    parser.add_argument("--top", default=None, help="metric to rank by")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    table = pd.read_csv(args.lifecycle)
+    index = build_index(table)
+
+    if args.region:
+        region = [p.strip().lower() for p in args.region]
+        if "pincode" in index["keys"] and len(region) == 3:
+            region[2] = int(region[2])
+        row = lookup(index, table, region[0] if len(region) == 1 else tuple(region))
+        print(row.T if row is not None else f"Region {args.region} not found")
+
+    if args.top:
+        print(top_k(index, table, args.top, args.k)[index["keys"] + [args.top]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import argparse
+import base64
+import hashlib
+import html
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import instrument
+from geo import GEOJSON_PATH, load_state_geometries, merge_map_data
+from states import state_ids
+
+
+# -------------------------------
+# FIGURES
+# -------------------------------
+
+# Each draw function fills a matplotlib Figure from the state-indexed
+# lifecycle table; adhar.py shows them interactively, the report renders
+# them to files. matplotlib / geopandas are imported only when drawing.
+
+def draw_update_ratio(fig, lifecycle):
+    ax = fig.subplots()
+    lifecycle["update_ratio"].sort_values(ascending=False).head(10).plot(
+        kind="bar",
+        ax=ax,
+        title="Top States by Aadhaar Update Ratio"
+    )
+    ax.set_ylabel("Update Ratio")
+
+
+def draw_assi(fig, lifecycle):
+    ax = fig.subplots()
+    lifecycle.sort_values("assi", ascending=False).head(10)[
+        "assi"
+    ].plot(
+        kind="bar",
+        ax=ax,
+        title="Top States by Aadhaar Service Stress Index (ASSI)"
+    )
+    ax.set_ylabel("ASSI (0–100)")
+
+
+def draw_friction(fig, lifecycle):
+    ax = fig.subplots()
+    lifecycle.sort_values("friction_score", ascending=False).head(10)[
+        "friction_score"
+    ].plot(
+        kind="bar",
+        ax=ax,
+        title="Top States by Aadhaar Update Friction Score"
+    )
+    ax.set_ylabel("Friction Score (0–100)")
+
+
+def draw_scatter(fig, lifecycle):
+    ax = fig.subplots()
+
+    # Color mapping for risk levels
+    color_map = {
+        "Low Risk": "green",
+        "Medium Risk": "orange",
+        "High Bottleneck Risk": "red"
+    }
+
+    colors = lifecycle["bottleneck_risk"].map(color_map)
+
+    ax.scatter(
+        lifecycle["enrolment_count"],
+        lifecycle["update_pressure"],
+        c=colors,
+        alpha=0.7
+    )
+
+    ax.set_xlabel("Enrolment Count")
+    ax.set_ylabel("Update Pressure Index")
+    ax.set_title("Enrolment vs Update Pressure (Bottleneck Detection)")
+
+    # Add legend manually
+    for label, color in color_map.items():
+        ax.scatter([], [], c=color, label=label)
+
+    ax.legend(title="Bottleneck Risk")
+    ax.grid(True)
+
+    top_states = lifecycle.sort_values("update_pressure", ascending=False).head(5)
+
+    for state in top_states.index:
+        ax.annotate(
+            state.title(),
+            (lifecycle.loc[state, "enrolment_count"],
+             lifecycle.loc[state, "update_pressure"]),
+            textcoords="offset points",
+            xytext=(5,5),
+            fontsize=9
+        )
+
+
+def draw_composition(fig, lifecycle):
+    ax = fig.subplots()
+
+    total_biometric = lifecycle["biometric_updates"].sum()
+    total_demographic = lifecycle["demographic_updates"].sum()
+
+    ax.pie(
+        [total_biometric, total_demographic],
+        labels=["Biometric Updates", "Demographic Updates"],
+        autopct="%1.1f%%",
+        startangle=90
+    )
+    ax.set_title("Overall Aadhaar Update Composition")
+
+
+def draw_india_map(fig, lifecycle, geojson_path=GEOJSON_PATH):
+    print("Loading India map...")
+
+    # Simplified geometry for a 10-inch figure when the store is built,
+    # otherwise the full GeoJSON; polygons carry canonical state IDs
+    india_map = load_state_geometries(geojson_path, width_px=1000)
+
+    print("India map loaded:", len(india_map), "states")
+
+    # Join on the integer state ID rather than the name
+    lifecycle_map = lifecycle.reset_index()
+    lifecycle_map["state_id"] = state_ids(lifecycle_map["state"])
+    merged_map = merge_map_data(india_map, lifecycle_map)
+
+    print("Merge completed")
+
+    ax = fig.subplots()
+    merged_map.plot(
+        column="update_pressure",
+        cmap="Reds",
+        linewidth=0.8,
+        ax=ax,
+        edgecolor="black",
+        legend=True
+    )
+
+    ax.set_title(
+        "India Map: Aadhaar Enrollment Bottleneck Risk",
+        fontsize=14
+    )
+    ax.axis("off")
+
+
+# name → (draw function, figsize, lifecycle columns it reads); the
+# columns are all a figure's worker receives and all its hash covers
+FIGURES = {
+    "update_ratio": (draw_update_ratio, (10, 5), ["update_ratio"]),
+    "assi": (draw_assi, (10, 5), ["assi"]),
+    "friction": (draw_friction, (10, 5), ["friction_score"]),
+    "scatter": (
+        draw_scatter, (10, 6),
+        ["enrolment_count", "update_pressure", "bottleneck_risk"]
+    ),
+    "composition": (
+        draw_composition, (6, 6), ["biometric_updates", "demographic_updates"]
+    ),
+    "india_map": (draw_india_map, (10, 12), ["update_pressure"])
+}
+
+
+# -------------------------------
+# HEADLESS REPORT
+# -------------------------------
+
+REPORT_DIR = "report"
+MANIFEST_NAME = "report_manifest.json"
+FORMATS = ("png", "svg")
+DPI = 100
+
+
+def _hash_form(data):
+    # The same values from adhar.py (categorical labels, int counts) and
+    # from its CSV export must hash alike: labels as text, every number
+    # in one fixed float format (CSV parsing may differ in the last bit)
+    form = pd.DataFrame(index=data.index.astype(str))
+    for column in data.columns:
+        values = data[column]
+        if pd.api.types.is_numeric_dtype(values):
+            form[column] = values.astype(float).map("{:.12g}".format).to_numpy()
+        else:
+            form[column] = values.astype(str).to_numpy()
+    return form
+
+
+def figure_hash(name, data, options, formats):
+    """
+    Hash of everything a figure's files depend on: its input columns
+    (values and state index), the draw code, size and output formats.
+    """
+    draw, figsize, _ = FIGURES[name]
+    digest = hashlib.sha256()
+    digest.update(
+        pd.util.hash_pandas_object(_hash_form(data), index=True).to_numpy().tobytes()
+    )
+    digest.update(",".join(map(str, data.columns)).encode())
+    digest.update(inspect.getsource(draw).encode())
+    digest.update(repr((figsize, DPI, sorted(formats))).encode())
+
+    geojson_path = options.get("geojson_path")
+    if geojson_path:
+        # The map also depends on the polygons it is drawn on
+        stat = os.stat(geojson_path)
+        digest.update(repr((geojson_path, stat.st_size, stat.st_mtime_ns)).encode())
+    return digest.hexdigest()
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def render_figure(task):
+    """Draw one figure on a bare Agg Figure and save it in each format."""
+    from matplotlib.figure import Figure
+
+    name, data, options, out_dir, formats = task
+    draw, figsize, _ = FIGURES[name]
+
+    start = time.perf_counter()
+    fig = Figure(figsize=figsize)
+    draw(fig, data, **options)
+
+    files = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{name}.{fmt}")
+        fig.savefig(path + ".tmp", format=fmt, dpi=DPI, bbox_inches="tight")
+        os.replace(path + ".tmp", path)
+        files.append(os.path.basename(path))
+    return name, files, time.perf_counter() - start
+
+
+def read_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_html(out_dir, manifest):
+    """One self-contained HTML page with every PNG embedded inline."""
+    sections = []
+    for name, entry in manifest.items():
+        png = os.path.join(out_dir, f"{name}.png")
+        if os.path.exists(png):
+            with open(png, "rb") as f:
+                src = "data:image/png;base64," + base64.b64encode(f.read()).decode()
+        else:
+            # No PNG rendered: link the first file instead
+            src = html.escape(entry["files"][0])
+        sections.append(
+            f"<h2>{html.escape(name.replace('_', ' ').title())}</h2>\n"
+            f'<img src="{src}" alt="{html.escape(name)}">'
+        )
+
+    page = (
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">\n"
+        "<title>Aadhaar Service Stress Report</title>\n"
+        "<style>body{font-family:sans-serif;max-width:1000px;margin:auto}"
+        "img{max-width:100%}</style></head><body>\n"
+        "<h1>Aadhaar Service Stress Report</h1>\n"
+        f"<p>Generated {time.strftime('%Y-%m-%d %H:%M:%S')}</p>\n"
+        + "\n".join(sections) + "\n</body></html>\n"
+    )
+    path = os.path.join(out_dir, "report.html")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(page)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+@instrument.stage("report")
+def render_report(lifecycle, out_dir=REPORT_DIR, geojson_path=GEOJSON_PATH,
+                  formats=FORMATS, figures=None, max_workers=None, force=False):
+    """
+    Render the figures to files plus report.html, without a display.
+
+    Figures whose input hash matches the manifest (and whose files
+    exist) are skipped; the rest are drawn in parallel, up to one process
+    per core, so with enough cores the wall time approaches that of the
+    slowest figure.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    previous = read_manifest(out_dir)
+    manifest = {}
+    tasks = []
+
+    for name in figures or FIGURES:
+        _, _, columns = FIGURES[name]
+        data = lifecycle[columns]
+        options = {"geojson_path": geojson_path} if name == "india_map" else {}
+        digest = figure_hash(name, data, options, formats)
+
+        old = previous.get(name, {})
+        files = [f"{name}.{fmt}" for fmt in formats]
+        if not force and old.get("hash") == digest and all(
+            os.path.exists(os.path.join(out_dir, f)) for f in files
+        ):
+            print(f"Unchanged, skipped: {name}")
+            manifest[name] = old
+            continue
+
+        manifest[name] = {"hash": digest, "files": files}
+        tasks.append((name, data, options, out_dir, list(formats)))
+
+    # Slowest figures (as last timed) first, so none starts at the end
+    tasks.sort(key=lambda task: -previous.get(task[0], {}).get("render_s", 0))
+
+    start = time.perf_counter()
+    if tasks:
+        # Imported before the pool starts so forked workers inherit it
+        import matplotlib.figure  # noqa: F401
+
+        # More workers than cores only time-slice the same figures
+        workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker
+        ) as pool:
+            for name, files, seconds in pool.map(render_figure, tasks):
+                manifest[name]["render_s"] = round(seconds, 3)
+                print(f"Rendered {name} in {seconds:.2f} s:", ", ".join(files))
+    wall = time.perf_counter() - start
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    path = write_html(out_dir, manifest)
+
+    print(f"Report: {len(tasks)} rendered, {len(manifest) - len(tasks)} "
+          f"unchanged, {wall:.2f} s")
+    print("Report written:", path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render the pipeline figures to PNG/SVG and one HTML report"
+    )
+    parser.add_argument("--lifecycle", default="aadhaar_bottleneck_prediction.csv",
+                        help="state-level table from adhar.py")
+    parser.add_argument("--out", default=REPORT_DIR)
+    parser.add_argument("--geojson", default=GEOJSON_PATH)
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS),
+                        choices=["png", "svg", "pdf"])
+    parser.add_argument("--figures", nargs="+", default=None,
+                        choices=list(FIGURES))
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true",
+                        help="re-render even if the inputs are unchanged")
+    args = parser.parse_args(argv)
+
+    lifecycle = pd.read_csv(args.lifecycle).set_index("state")
+    render_report(lifecycle, args.out, args.geojson, args.formats,
+                  args.figures, args.max_workers, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# -------------------------------
+# UIDAI COUNT COLUMN SCHEMA
+# -------------------------------
+
+# Every count column of the three API dumps (cleaned names) and the age
+# cohort it counts. The update dumps' adult bucket is "17_" (17 and
+# over); it is folded into the 18+ cohort here.
+COHORTS = ("0_5", "5_17", "18_plus")
+
+SCHEMA = {
+    "enrolment_count": {
+        "age_0_5": "0_5",
+        "age_5_17": "5_17",
+        "age_18_greater": "18_plus"
+    },
+    "demographic_updates": {
+        "demo_age_5_17": "5_17",
+        "demo_age_17_": "18_plus"
+    },
+    "biometric_updates": {
+        "bio_age_5_17": "5_17",
+        "bio_age_17_": "18_plus"
+    }
+}
+
+# Dataset totals, in the enrolment / demographic / biometric folder order
+COUNT_NAMES = tuple(SCHEMA)
+
+
+def clean_column(name):
+    return name.strip().lower()
+
+
+def cohort_column(value_name, cohort):
+    # enrolment_count, "0_5" → enrolment_0_5
+    return f"{value_name.split('_')[0]}_{cohort}"
+
+
+def cohort_columns(value_name):
+    """A dataset's cohort count columns, youngest first."""
+    return [cohort_column(value_name, c) for c in SCHEMA[value_name].values()]
+
+
+# Source column → cohort count column, across all datasets (the source
+# names are distinct, so a header alone identifies its dataset)
+COHORT_COLUMNS = {
+    source: cohort_column(name, cohort)
+    for name, sources in SCHEMA.items()
+    for source, cohort in sources.items()
+}
+
+
+def count_columns(header):
+    """The header's known count columns, as spelled in the header."""
+    found = [c for c in header if clean_column(c) in COHORT_COLUMNS]
+    if not found:
+        raise ValueError(
+            f"No known count columns in {list(header)}; "
+            f"expected some of {sorted(COHORT_COLUMNS)}"
+        )
+    return found
+
+
+def dataset_counts(sums, value_name):
+    """
+    Per-key sums of a dataset's count columns → its cohort columns plus
+    the total (`value_name`, first). Cohorts absent from the input are 0.
+    """
+    sums = sums.rename(columns=lambda c: COHORT_COLUMNS.get(clean_column(c), c))
+    counts = sums.reindex(columns=cohort_columns(value_name), fill_value=0)
+    counts.insert(0, value_name, counts.sum(axis=1))
+    return counts
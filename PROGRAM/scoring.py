@@ -0,0 +1,290 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------
+# ASSI SCORING
+# -------------------------------
+
+# Weights of the normalised ASSI components (STEP 10). The age-cohort
+# components are off by default; assi_cohort_config.json weights them in
+ASSI_WEIGHTS = {
+    "fp_norm": 0.35,    # friction pressure
+    "ul_norm": 0.25,    # update load
+    "bp_norm": 0.20,    # biometric pressure
+    "ew_norm": 0.20,    # enrolment weakness
+    "mb_norm": 0.0,     # child mandatory biometric update backlog
+    "cu_norm": 0.0      # child update share
+}
+
+# Raw lifecycle component behind each normalised ASSI input
+COMPONENTS = {
+    "fp_norm": "friction_pressure",
+    "ul_norm": "update_load",
+    "bp_norm": "biometric_pressure",
+    "ew_norm": "enrolment_weakness",
+    "mb_norm": "mbu_backlog",
+    "cu_norm": "child_update_share"
+}
+
+# Age-cohort components: optional in a config (weight 0 when left out,
+# so configs written for the four totals-based components still load)
+COHORT_COMPONENTS = ("mb_norm", "cu_norm")
+
+DEFAULT_CONFIG = {"weights": ASSI_WEIGHTS, "normalization": "minmax"}
+
+
+# Normalization
+def normalize(series):
+    return (series - series.min()) / (series.max() - series.min())
+
+
+def zscore(series):
+    return (series - series.mean()) / series.std()
+
+
+def rank_normalize(series):
+    # 0 for the lowest region, 1 for the highest; ties share a rank
+    return (series.rank() - 1) / (series.count() - 1)
+
+
+NORMALIZERS = {
+    "minmax": normalize,
+    "zscore": zscore,
+    "rank": rank_normalize
+}
+
+
+def cohort_components(counts):
+    """
+    Raw age-cohort components from per-region cohort counts (a lifecycle
+    table, or a dict of date x state frames).
+
+    mbu_backlog: share of child enrolments (0-5 and 5-17) not matched by
+    5-17 biometric updates. Every enrolled child owes a mandatory
+    biometric update, at 5 and again at 15.
+    child_update_share: share of all updates made by the 5-17 cohort.
+    Tables exported before the cohort columns existed get 0 for both.
+    """
+    cohorts = (
+        "enrolment_0_5", "enrolment_5_17", "demographic_5_17", "biometric_5_17"
+    )
+    if not all(column in counts for column in cohorts):
+        zero = counts["enrolment_count"] * 0.0
+        return {"mbu_backlog": zero, "child_update_share": zero}
+
+    children = counts["enrolment_0_5"] + counts["enrolment_5_17"]
+    child_updates = counts["demographic_5_17"] + counts["biometric_5_17"]
+    total = counts["demographic_updates"] + counts["biometric_updates"]
+
+    # No child enrolments: nothing can be owed
+    backlog = (children - counts["biometric_5_17"]).clip(lower=0)
+    return {
+        "mbu_backlog": (backlog / children.where(children > 0)).fillna(0),
+        "child_update_share": (child_updates / total.where(total > 0)).fillna(0)
+    }
+
+
+def assi_components(lifecycle):
+    """Raw STEP 10 components from a lifecycle table."""
+    total = lifecycle["total_updates"]
+    enrolments = lifecycle["enrolment_count"]
+
+    return pd.DataFrame({
+        "friction_pressure": total / enrolments,
+        "update_load": total,
+        # No updates: no biometric share (0, not NaN, so the region scores)
+        "biometric_pressure": (
+            lifecycle["biometric_updates"] / total.where(total > 0)
+        ).fillna(0),
+        "enrolment_weakness": 1 / enrolments,
+        **cohort_components(lifecycle)
+    }, index=lifecycle.index)
+
+
+def normalize_cohort(values):
+    # A cohort signal that is flat across regions (e.g. no backlog
+    # anywhere) normalises to 0/0; it then adds no stress instead of NaN
+    return values.fillna(0)
+
+
+def normalize_components(raw, method="minmax", by=None):
+    """
+    Normalised ASSI inputs from raw components, across all regions, or
+    within each group of the index level(s) `by` (e.g. per date bucket).
+    """
+    if method not in NORMALIZERS:
+        raise ValueError(f"Unknown normalization: {method!r}")
+    norm = NORMALIZERS[method]
+    if by is not None:
+        def norm(values, method=norm):
+            return values.groupby(level=by).transform(method)
+
+    return pd.DataFrame(
+        {
+            key: normalize_cohort(norm(raw[column]))
+            if key in COHORT_COMPONENTS else norm(raw[column])
+            for key, column in COMPONENTS.items()
+        },
+        index=raw.index
+    )
+
+
+def check_config(config):
+    weights = {key: 0.0 for key in COHORT_COMPONENTS}
+    weights.update(config.get("weights", {}))
+    if set(weights) != set(COMPONENTS):
+        raise ValueError(
+            f"ASSI weights must cover exactly {sorted(COMPONENTS)} "
+            f"({', '.join(COHORT_COMPONENTS)} optional), "
+            f"got {sorted(config.get('weights', {}))}"
+        )
+    method = config.get("normalization", "minmax")
+    if method not in NORMALIZERS:
+        raise ValueError(f"Unknown normalization: {method!r}")
+    return {
+        "weights": {key: weights[key] for key in COMPONENTS},
+        "normalization": method
+    }
+
+
+def config_version(config):
+    """Stable short id for a scoring config (same config → same version)."""
+    config = check_config(config)
+    canonical = json.dumps(config, sort_keys=True)
+    return "assi-" + hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:10]
+
+
+def load_config(path=None):
+    if path is None:
+        return DEFAULT_CONFIG
+    with open(path, encoding="utf-8") as f:
+        return check_config(json.load(f))
+
+
+# -------------------------------
+# INTERVENTION EFFICIENCY (STEP 10.6)
+# -------------------------------
+
+def capacity_proxy(enrolment_count):
+    # Avoid division by zero
+    return enrolment_count.replace(0, 1)
+
+
+def ies_scores(assi, enrolment_count):
+    """IES (0–100) for one ASSI Series or a regions x configs frame."""
+    raw = assi.div(capacity_proxy(enrolment_count), axis=0)
+    return (normalize(raw) * 100).round(1)
+
+
+# -------------------------------
+# BATCH SCORING
+# -------------------------------
+
+def score_configs(lifecycle, configs):
+    """
+    Score many ASSI configs against one lifecycle table.
+
+    Components are normalised once per normalisation method; all configs
+    sharing that method are then scored with a single
+    (regions x components) @ (components x configs) matrix product.
+
+    Returns (assi, ies, manifest): assi and ies are regions x versions
+    frames, manifest describes each version's weights and normalisation.
+    """
+    configs = [check_config(c) for c in configs]
+
+    # Identical configs share a version; score each once
+    unique = {}
+    for config in configs:
+        unique.setdefault(config_version(config), config)
+    versions = list(unique)
+
+    raw = assi_components(lifecycle)
+    scores = np.empty((len(lifecycle), len(versions)))
+
+    by_method = {}
+    for i, version in enumerate(versions):
+        by_method.setdefault(unique[version]["normalization"], []).append(i)
+
+    for method, cols in by_method.items():
+        norm = normalize_components(raw, method)
+        weights = np.array([
+            [unique[versions[i]]["weights"][key] for i in cols]
+            for key in norm.columns
+        ])
+        scores[:, cols] = norm.to_numpy() @ weights * 100
+
+    assi = pd.DataFrame(scores, index=lifecycle.index, columns=versions).round(1)
+    ies = ies_scores(assi, lifecycle["enrolment_count"])
+
+    manifest = pd.DataFrame([
+        {"version": v, "normalization": c["normalization"], **c["weights"]}
+        for v, c in unique.items()
+    ]).set_index("version")
+
+    return assi, ies, manifest
+
+
+def random_configs(n, normalization="minmax", seed=0):
+    """n weight vectors drawn uniformly from the simplex (weights sum to 1)."""
+    rng = np.random.default_rng(seed)
+    draws = rng.dirichlet(np.ones(len(COMPONENTS)), size=n)
+    return [
+        {
+            "weights": dict(zip(COMPONENTS, map(float, row))),
+            "normalization": normalization
+        }
+        for row in draws
+    ]
+
+
+def read_lifecycle(path):
+    # State-level or hierarchy (state/district/pincode) exports
+    header = pd.read_csv(path, nrows=0).columns
+    keys = [c for c in ("state", "district", "pincode") if c in header]
+    return pd.read_csv(path, index_col=keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score many ASSI weight/normalisation configs at once"
+    )
+    parser.add_argument("--lifecycle", default="aadhaar_bottleneck_prediction.csv",
+                        help="lifecycle table exported by adhar.py")
+    parser.add_argument("--configs", default=None,
+                        help='JSON list of {"weights": {...}, "normalization": ...}')
+    parser.add_argument("--random", type=int, default=0,
+                        help="also score this many random weight vectors")
+    parser.add_argument("--normalization", default="minmax",
+                        choices=list(NORMALIZERS),
+                        help="normalisation for --random configs")
+    parser.add_argument("--output", default="assi_batch.csv")
+    args = parser.parse_args(argv)
+
+    configs = [DEFAULT_CONFIG]
+    if args.configs:
+        with open(args.configs, encoding="utf-8") as f:
+            configs += json.load(f)
+    configs += random_configs(args.random, args.normalization)
+
+    lifecycle = read_lifecycle(args.lifecycle)
+    assi, ies, manifest = score_configs(lifecycle, configs)
+
+    stem, ext = os.path.splitext(args.output)
+    assi.to_csv(args.output)
+    ies.to_csv(f"{stem}_ies{ext}")
+    manifest.to_csv(f"{stem}_configs{ext}")
+
+    print(f"Scored {len(manifest)} configs x {len(lifecycle)} regions")
+    print("Default config version:", config_version(DEFAULT_CONFIG))
+    print("Written:", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from states import dedupe_states
+
+
+# -------------------------------
+# WHAT-IF POLICY SIMULATION
+# -------------------------------
+
+# Policy assumption: each temporary center cuts a metric by CENTER_EFFECT
+# (2%). Sweeps cover 0..MAX_CENTERS centers for every EFFECT_SIZES value.
+CENTER_EFFECT = 0.02
+MAX_CENTERS = 10
+EFFECT_SIZES = (0.01, 0.02, 0.03)
+SIM_METRICS = ("assi", "update_pressure")
+
+
+def center_factor(centers, effect=CENTER_EFFECT):
+    """Multiplier left after `centers` centers; never below zero."""
+    return np.clip(1 - np.multiply(centers, effect), 0, None)
+
+
+def reduction_factors(max_centers=MAX_CENTERS, effects=EFFECT_SIZES):
+    """(centers x effects) multipliers for every sweep point."""
+    centers = np.arange(max_centers + 1)
+    return center_factor(centers[:, None], np.asarray(effects)[None, :])
+
+
+def simulate_interventions(table, metrics=SIM_METRICS, max_centers=MAX_CENTERS,
+                           effects=EFFECT_SIZES):
+    """
+    Post-intervention values for every state x center count x effect size.
+
+    One (states x 1 x 1 x metrics) * (1 x centers x effects x 1) broadcast;
+    returned long, indexed by (state, centers, effect) with one column per
+    metric, so a single state/slider value is a plain .loc lookup.
+    """
+    effects = tuple(effects)
+    duplicated = table["state"].astype(str).duplicated()
+    if duplicated.any():
+        raise ValueError(
+            "One row per state needed; duplicated: "
+            f"{sorted(table.loc[duplicated, 'state'].astype(str).unique())}"
+        )
+    base = table[list(metrics)].to_numpy(dtype=float)
+    factors = reduction_factors(max_centers, effects)
+
+    values = base[:, None, None, :] * factors[None, :, :, None]
+
+    index = pd.MultiIndex.from_product(
+        [table["state"].astype(str), range(max_centers + 1), effects],
+        names=["state", "centers", "effect"]
+    )
+    # Sorted, so partial lookups (.loc[state]) use the index directly
+    return pd.DataFrame(
+        values.reshape(-1, len(metrics)),
+        index=index,
+        columns=list(metrics)
+    ).sort_index()
+
+
+def national_view(simulation):
+    """Mean of each metric across states per (centers, effect)."""
+    return simulation.groupby(level=["centers", "effect"]).mean()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Sweep the what-if simulator over all states at once"
+    )
+    parser.add_argument("--lifecycle", default="aadhaar_bottleneck_prediction.csv",
+                        help="state table exported by adhar.py")
+    parser.add_argument("--max-centers", type=int, default=MAX_CENTERS)
+    parser.add_argument("--effects", type=float, nargs="+",
+                        default=list(EFFECT_SIZES),
+                        help="assumed reduction per center (0.02 = 2%%)")
+    parser.add_argument("--output", default="whatif_sweep.csv")
+    args = parser.parse_args(argv)
+
+    table = dedupe_states(pd.read_csv(args.lifecycle))
+    simulation = simulate_interventions(
+        table, max_centers=args.max_centers, effects=args.effects
+    )
+    simulation.to_csv(args.output)
+
+    print(f"Simulated {len(table)} states x {args.max_centers + 1} center "
+          f"counts x {len(args.effects)} effect sizes")
+    print("Written:", args.output)
+
+
+if __name__ == "__main__":
+    main()
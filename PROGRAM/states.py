@@ -0,0 +1,242 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------
+# CANONICAL STATE INDEX
+# -------------------------------
+
+# LGD state code → canonical (lowercase) name. The LGD code is the
+# canonical state ID used for groupbys and the map join.
+STATES = {
+    1: "jammu and kashmir",
+    2: "himachal pradesh",
+    3: "punjab",
+    4: "chandigarh",
+    5: "uttarakhand",
+    6: "haryana",
+    7: "delhi",
+    8: "rajasthan",
+    9: "uttar pradesh",
+    10: "bihar",
+    11: "sikkim",
+    12: "arunachal pradesh",
+    13: "nagaland",
+    14: "manipur",
+    15: "mizoram",
+    16: "tripura",
+    17: "meghalaya",
+    18: "assam",
+    19: "west bengal",
+    20: "jharkhand",
+    21: "odisha",
+    22: "chhattisgarh",
+    23: "madhya pradesh",
+    24: "gujarat",
+    27: "maharashtra",
+    28: "andhra pradesh",
+    29: "karnataka",
+    30: "goa",
+    31: "lakshadweep",
+    32: "kerala",
+    33: "tamil nadu",
+    34: "puducherry",
+    35: "andaman and nicobar islands",
+    36: "telangana",
+    37: "ladakh",
+    38: "dadra and nagar haveli and daman and diu"
+}
+
+# Retired LGD codes → the unit that replaced them (merged in 2020)
+SUCCESSOR_IDS = {
+    25: 38,     # daman and diu
+    26: 38      # dadra and nagar haveli
+}
+
+# Old names and spellings seen in UIDAI dumps and map files. Matching is
+# on a compact key (see name_key), so "&"/"and", spacing, punctuation and
+# a leading "the" are already handled.
+STATE_ALIASES = {
+    "nct of delhi": 7,
+    "national capital territory of delhi": 7,
+    "new delhi": 7,
+    "orissa": 21,
+    "pondicherry": 34,
+    "uttaranchal": 5,
+    "west bangal": 19,
+    "west bengli": 19,
+    "chhatisgarh": 22,
+    "chattisgarh": 22,
+    "andaman and nicobar": 35,
+    "andaman and nicobar island": 35,
+    "daman and diu": 38,
+    "dadra and nagar haveli": 38,
+    "dadra nagar haveli": 38
+}
+
+# Renamed districts, keyed by (state ID, old name)
+DISTRICT_ALIASES = {
+    (6, "gurgaon"): "gurugram",
+    (6, "mewat"): "nuh",
+    (9, "allahabad"): "prayagraj",
+    (9, "faizabad"): "ayodhya",
+    (23, "hoshangabad"): "narmadapuram",
+    (27, "aurangabad"): "chhatrapati sambhajinagar",
+    (27, "osmanabad"): "dharashiv",
+    (29, "bangalore"): "bengaluru urban",
+    (29, "bangalore urban"): "bengaluru urban",
+    (29, "bangalore rural"): "bengaluru rural",
+    (29, "belgaum"): "belagavi",
+    (29, "bellary"): "ballari",
+    (29, "bijapur"): "vijayapura",
+    (29, "chikmagalur"): "chikkamagaluru",
+    (29, "gulbarga"): "kalaburagi",
+    (29, "mysore"): "mysuru",
+    (29, "shimoga"): "shivamogga",
+    (29, "tumkur"): "tumakuru"
+}
+
+
+def name_key(name):
+    """Compact matching key: 'The Andaman & Nicobar' → 'andamanandnicobar'."""
+    name = str(name).strip().lower().replace("&", " and ")
+    name = re.sub(r"^the\s+", "", name)
+    return re.sub(r"[^a-z0-9]", "", name)
+
+
+def _build_lookup():
+    lookup = {name_key(name): state_id for state_id, name in STATES.items()}
+    for alias, state_id in STATE_ALIASES.items():
+        lookup[name_key(alias)] = state_id
+    return lookup
+
+
+STATE_LOOKUP = _build_lookup()
+UNMATCHED_ID = -1
+
+
+def resolve_state(name):
+    """
+    Canonical ID for one raw state name or LGD state code.
+
+    Retired codes resolve to their successor. Returns None for values
+    that are not states at all (missing, or numbers that are no LGD state
+    code, e.g. a leaked 100000) and UNMATCHED_ID for names that are not
+    in the index.
+    """
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return None
+    code = str(name).strip()
+    if re.fullmatch(r"\d+(\.0*)?", code):
+        code = int(float(code))
+        code = SUCCESSOR_IDS.get(code, code)
+        return code if code in STATES else None
+    key = name_key(name)
+    if not key or key.isnumeric():
+        return None
+    return STATE_LOOKUP.get(key, UNMATCHED_ID)
+
+
+def canonical_states(values, report=True):
+    """
+    Map raw state names to a categorical of canonical names.
+
+    Only the distinct raw names are resolved; rows are remapped through
+    their category codes. Unmatched names are kept (cleaned, lowercase)
+    so their rows are not lost, and listed when `report` is set.
+    LGD state codes map to their state; other numbers and blanks become
+    missing.
+    """
+    raw = pd.Categorical(values)
+    resolved = []
+    unmatched = []
+    for name in raw.categories:
+        state_id = resolve_state(name)
+        if state_id is None:
+            resolved.append(None)
+        elif state_id == UNMATCHED_ID:
+            cleaned = " ".join(str(name).lower().split())
+            resolved.append(cleaned)
+            unmatched.append(str(name))
+        else:
+            resolved.append(STATES[state_id])
+
+    categories = pd.Index(sorted({n for n in resolved if n is not None}))
+    # Trailing -1 keeps rows with a missing raw name missing
+    remap = np.array(
+        [categories.get_loc(n) if n is not None else -1 for n in resolved] + [-1],
+        dtype=np.int32
+    )
+
+    if report and unmatched:
+        counts = pd.Series(raw).value_counts()
+        print("Unmatched state names (kept as-is, not on the map):")
+        for name in unmatched:
+            print(f"  {name!r}: {counts.get(name, 0)} rows")
+
+    return pd.Categorical.from_codes(remap[raw.codes], categories)
+
+
+def state_ids(names):
+    """LGD IDs for canonical (or raw) names; UNMATCHED_ID if unknown."""
+    ids = [resolve_state(name) for name in names]
+    return np.array(
+        [UNMATCHED_ID if i is None else i for i in ids],
+        dtype=np.int16
+    )
+
+
+def successor_ids(ids):
+    # Geometry for retired units joins the data of the merged unit
+    return pd.Series(ids).replace(SUCCESSOR_IDS).to_numpy(dtype=np.int16)
+
+
+def dedupe_states(table):
+    """
+    One row per canonical state of a state-level export (a "state"
+    column). Older exports can hold a row per alias of one state; the
+    row with the most enrolments is kept, in the table's own order.
+    Rows whose name is not a state at all are dropped.
+    """
+    table = table.assign(state=canonical_states(table["state"], report=False))
+    table = table[table["state"].notna()]
+    keep = (
+        table.sort_values("enrolment_count", ascending=False, kind="stable")
+        .drop_duplicates("state").index
+    )
+    dropped = len(table) - len(keep)
+    if dropped:
+        print(f"Dropped {dropped} duplicate state rows")
+    table = table.loc[table.index.isin(keep)].reset_index(drop=True)
+    table["state"] = table["state"].astype(str)
+    return table
+
+
+def canonicalize_sums(sums):
+    """Merge per-state sums whose index names are aliases of one state."""
+    keys = canonical_states(sums.index)
+    merged = sums.groupby(keys, observed=True).sum()
+    merged.index = merged.index.astype(str)
+    merged.index.name = "state"
+    return merged
+
+
+# -------------------------------
+# DISTRICTS
+# -------------------------------
+
+def canonical_districts(states, districts):
+    """Cleaned district names with known renames applied per state."""
+    cleaned = districts.astype("string").str.strip().str.lower()
+    cleaned = cleaned.str.replace(r"\s+", " ", regex=True)
+
+    # Resolve each distinct state once, then broadcast to the rows
+    states = pd.Categorical(states)
+    ids = np.append(state_ids(states.categories), UNMATCHED_ID)[states.codes]
+
+    for (state_id, old), new in DISTRICT_ALIASES.items():
+        match = (cleaned == old).fillna(False).to_numpy(dtype=bool)
+        cleaned = cleaned.mask(match & (ids == state_id), new)
+    return cleaned
@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from adhar import BIO_DIR, DEMO_DIR, ENROL_DIR
+from schema import SCHEMA
+from states import STATE_ALIASES, STATES
+
+
+# -------------------------------
+# SYNTHETIC UIDAI-SHAPED DATA
+# -------------------------------
+
+# Same folders and column layout as the UIDAI API dumps: one count
+# column per age cohort, as mapped in schema.py
+DATASETS = {
+    folder: list(SCHEMA[name])
+    for folder, name in zip((ENROL_DIR, DEMO_DIR, BIO_DIR), SCHEMA)
+}
+KEY_COLUMNS = ["date", "state", "district", "pincode"]
+
+SHARD_ROWS = 1_000_000
+DISTRICTS_PER_STATE = 40
+START_DATE = "2025-03-01"
+DAYS = 120
+MANIFEST_NAME = "synth_manifest.json"
+
+
+def _state_tables(seed):
+    # Fixed per dataset run: row share and count scale per state, and one
+    # "dirty" spelling per state (an alias, or the name in capitals)
+    rng = np.random.default_rng(seed)
+    ids = sorted(STATES)
+    aliases = {}
+    for alias, state_id in STATE_ALIASES.items():
+        aliases.setdefault(state_id, alias.title())
+
+    names = np.array([STATES[i].title() for i in ids], dtype=object)
+    dirty = np.array(
+        [aliases.get(i, STATES[i].upper()) for i in ids], dtype=object
+    )
+    share = rng.dirichlet(np.full(len(ids), 2.0))
+    scale = rng.uniform(0.5, 2.0, len(ids))
+    return np.array(ids), names, dirty, share, scale
+
+
+def make_shard(columns, rows, seed, dirty_rate=0.01, table_seed=0,
+               start_date=START_DATE, days=DAYS):
+    """One shard of `rows` synthetic rows with the UIDAI column layout."""
+    ids, names, dirty, share, scale = _state_tables(table_seed)
+    rng = np.random.default_rng(seed)
+
+    state = rng.choice(len(ids), rows, p=share)
+    district = rng.integers(0, DISTRICTS_PER_STATE, rows)
+
+    # Mostly canonical names; a few alias spellings and numeric codes
+    state_names = names[state]
+    roll = rng.random(rows)
+    state_names[roll < dirty_rate] = dirty[state[roll < dirty_rate]]
+    state_names[roll < dirty_rate / 20] = "100000"
+
+    dates = pd.date_range(start_date, periods=days).strftime("%d-%m-%Y")
+    district_names = np.array(
+        [f"District {d + 1}" for d in range(DISTRICTS_PER_STATE)], dtype=object
+    )
+
+    df = pd.DataFrame({
+        "date": np.asarray(dates, dtype=object)[rng.integers(0, days, rows)],
+        "state": state_names,
+        "district": district_names[district],
+        # 6 digits, unique per (state, district) block
+        "pincode": (
+            100000 + ids[state] * 20000 + district * 100
+            + rng.integers(0, 100, rows)
+        )
+    })
+    for i, column in enumerate(columns):
+        df[column] = rng.poisson(scale[state] * (3 + 2 * i))
+    return df
+
+
+def _write_shard(task):
+    path, columns, rows, seed, dirty_rate, table_seed = task
+    make_shard(columns, rows, seed, dirty_rate, table_seed).to_csv(path, index=False)
+    return path
+
+
+def generate(out_dir, rows, shard_rows=SHARD_ROWS, seed=0, dirty_rate=0.01,
+             workers=None):
+    """
+    Write `rows` rows per dataset as CSV shards under out_dir.
+
+    Shards are generated independently (seeded by dataset and shard
+    number), so memory stays at one shard per worker at any size and
+    reruns with the same arguments produce identical files.
+    """
+    tasks = []
+    manifest = {"rows": rows, "shard_rows": shard_rows, "seed": seed,
+                "dirty_rate": dirty_rate, "datasets": {}}
+
+    for d, (folder, columns) in enumerate(DATASETS.items()):
+        os.makedirs(os.path.join(out_dir, folder), exist_ok=True)
+        n_shards = -(-rows // shard_rows)
+        for shard in range(n_shards):
+            size = min(shard_rows, rows - shard * shard_rows)
+            path = os.path.join(out_dir, folder, f"part_{shard:05d}.csv")
+            tasks.append((path, columns, size, (seed, d, shard), dirty_rate, seed))
+        manifest["datasets"][folder] = {"rows": rows, "shards": n_shards}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path in pool.map(_write_shard, tasks):
+            print("Written:", path)
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic UIDAI-shaped CSV shards"
+    )
+    parser.add_argument("--rows", type=int, default=100_000,
+                        help="rows per dataset (enrolment/demographic/biometric)")
+    parser.add_argument("--out", default="synthetic_data")
+    parser.add_argument("--shard-rows", type=int, default=SHARD_ROWS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dirty-rate", type=float, default=0.01,
+                        help="share of rows with alias spellings / numeric codes")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    generate(args.out, args.rows, args.shard_rows, args.seed,
+             args.dirty_rate, args.workers)
+    print(f"Generated {args.rows} rows per dataset in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+
+import pandas as pd
+
+import instrument
+from schema import COUNT_NAMES, count_columns, dataset_counts
+from scoring import (
+    DEFAULT_CONFIG,
+    assi_components,
+    check_config,
+    normalize_components
+)
+from states import canonical_districts, canonical_states
+
+
+# Bucket sizes for the time-bucketed lifecycle table
+FREQUENCIES = {
+    "daily": "D",
+    "weekly": "W",
+    "monthly": "M"
+}
+
+
+# -------------------------------
+# TIME-BUCKETED AGGREGATION
+# -------------------------------
+
+def bucket_dates(dates, freq):
+    # UIDAI dumps use dd-mm-yyyy
+    dates = pd.to_datetime(dates, dayfirst=True, errors="coerce")
+    return dates.dt.to_period(freq).dt.start_time
+
+
+def aggregate_by_date(enrol, demo, bio, freq="W", keys=("state",)):
+    """
+    Per (region, bucket) enrolment / demographic / biometric sums; a
+    region is a state, or a (state, district) pair with
+    keys=("state", "district").
+    """
+    keys = list(keys)
+    parts = []
+    for df, name in zip((enrol, demo, bio), COUNT_NAMES):
+        bucket = bucket_dates(df["date"], freq).rename("date")
+        parts.append(dataset_counts(
+            df.groupby([df[k] for k in keys] + [bucket], observed=True)[
+                count_columns(df.columns)
+            ]
+            .sum(),
+            name
+        ))
+
+    sums = pd.concat(parts, axis=1).fillna(0).reset_index()
+
+    # Canonical names on the aggregated keys, then merge rows that collide
+    sums["state"] = canonical_states(sums["state"], report=False).astype(object)
+    if "district" in keys:
+        sums["district"] = canonical_districts(sums["state"], sums["district"])
+    sums = sums[sums["state"].notna()]
+
+    return sums.groupby(keys + ["date"]).sum().sort_index()
+
+
+# -------------------------------
+# ROLLING ASSI & UPDATE PRESSURE
+# -------------------------------
+
+def rolling_metrics(sums, freq="W", window=4, assi_config=DEFAULT_CONFIG):
+    """
+    Rolling update_pressure and ASSI on the sorted (state, date) sums.
+
+    Each count is pivoted to a date x state frame on a complete calendar
+    (missing buckets are zero, so a window always spans `window` periods)
+    and rolled for all states at once. ASSI is scored as in STEP 10, with
+    the same config, but normalised across states within each bucket.
+    """
+    config = check_config(assi_config)
+    wide = {
+        name: sums[name].unstack("state", fill_value=0)
+        for name in sums.columns
+    }
+
+    dates = wide["enrolment_count"].index
+    calendar = pd.period_range(dates.min(), dates.max(), freq=freq).start_time
+    states = wide["enrolment_count"].columns
+
+    wide = {
+        name: frame.reindex(index=calendar, columns=states, fill_value=0)
+        for name, frame in wide.items()
+    }
+    rolled = {
+        name: frame.rolling(window, min_periods=1).sum()
+        for name, frame in wide.items()
+    }
+
+    # Windows without enrolments cannot be scored (cf. STEP 4)
+    enrolments = rolled["enrolment_count"].where(
+        rolled["enrolment_count"] > 0
+    )
+    total = rolled["demographic_updates"] + rolled["biometric_updates"]
+
+    # Scored windows as one long (date, state) lifecycle table
+    windows = pd.DataFrame({
+        name: frame.rename_axis("date").stack() for name, frame in rolled.items()
+    })
+    windows["total_updates"] = (
+        windows["demographic_updates"] + windows["biometric_updates"]
+    )
+    windows = windows[windows["enrolment_count"] > 0]
+
+    norm = normalize_components(
+        assi_components(windows), config["normalization"], by="date"
+    )
+    assi = sum(
+        weight * norm[component]
+        for component, weight in config["weights"].items()
+    ) * 100
+
+    columns = {name: wide[name] for name in COUNT_NAMES}
+    columns["update_pressure"] = total / enrolments
+    columns["assi"] = assi.round(1).unstack("state").reindex(
+        index=calendar, columns=states
+    )
+
+    # Back to long format, one row per (state, date)
+    index = pd.MultiIndex.from_product([calendar, states], names=["date", "state"])
+    long = pd.DataFrame(
+        {name: frame.to_numpy().ravel() for name, frame in columns.items()},
+        index=index
+    )
+    for name in COUNT_NAMES:
+        long[name] = long[name].astype("int64")
+
+    return long.swaplevel().sort_index()
+
+
+@instrument.stage("timeseries")
+def state_timeseries(enrol, demo, bio, freq="W", window=4,
+                     assi_config=DEFAULT_CONFIG):
+    sums = aggregate_by_date(enrol, demo, bio, freq)
+    table = rolling_metrics(sums, freq, window, assi_config)
+
+    print(f"\nTime series ({freq}, window={window}):", table.shape)
+    print(table.head())
+
+    return table
+
+
+def export_timeseries(table, output_path, name):
+    stem, ext = os.path.splitext(output_path)
+    path = f"{stem}_timeseries_{name}{ext or '.csv'}"
+    table.to_csv(path)
+    print("Exported time series:", path)